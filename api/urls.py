@@ -4,6 +4,8 @@ from users.views import UserViewSet
 from vendors.views import VendorProfileViewSet
 from orders.views import RepairOrderViewSet
 from cart.views import CartViewSet, CartItemViewSet
+from services.views import ServiceViewSet, ServiceVariantViewSet, CatalogViewSet
+from search.views import SearchView
 
 router = routers.DefaultRouter()
 router.register('customers', UserViewSet, basename='customer')
@@ -21,6 +23,10 @@ vendor_router.register('orders', RepairOrderViewSet, basename='vendor-orders')
 router.register("carts", CartViewSet, basename="cart")
 router.register("cart-items", CartItemViewSet, basename="cart-items")
 
+router.register("services", ServiceViewSet, basename="service")
+router.register("service-variants", ServiceVariantViewSet, basename="service-variant")
+router.register("catalog", CatalogViewSet, basename="catalog")
+
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(customer_router.urls)),
@@ -28,5 +34,6 @@ urlpatterns = [
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
     path("payments/", include("payment.urls")),
+    path("search/", SearchView.as_view(), name="search"),
 
 ]
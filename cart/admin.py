@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models import Count
+from common.admin import LargeTableAdmin
 from .models import Cart, CartItem
 
 
@@ -8,27 +10,37 @@ class CartItemInline(admin.TabularInline):
     readonly_fields = ("variant", "quantity")
     can_delete = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("variant")
+
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(LargeTableAdmin):
     list_display = ("user_email", "item_count", "created_at")
+    list_select_related = ("user",)
     inlines = [CartItemInline]
     search_fields = ("user__email",)
     readonly_fields = ("created_at",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(item_count=Count("items"))
+
     def user_email(self, obj):
         return obj.user.email
 
     def item_count(self, obj):
-        return obj.items.count()
+        return obj.item_count
 
     user_email.short_description = "Customer"
     item_count.short_description = "Items"
+    user_email.admin_order_field = "user__email"
+    item_count.admin_order_field = "item_count"
 
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(LargeTableAdmin):
     list_display = ("cart_user", "variant_name", "quantity")
+    list_select_related = ("cart__user", "variant")
     search_fields = ("cart__user__email", "variant__name")
 
     def cart_user(self, obj):
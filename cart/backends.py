@@ -0,0 +1,330 @@
+# carts/backends.py
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+from common.cache import bump_namespaces
+from common.redis import redis_client
+from services.cache import get_variants
+from services.models import ServiceVariant
+from .models import Cart, CartItem
+
+
+def get_cart_backend():
+    return import_string(settings.CART_BACKEND)()
+
+
+def cart_changed(user_id):
+    # cached cart responses are invalidated here rather than from CartItem signals
+    transaction.on_commit(lambda: bump_namespaces([f"cart:{user_id}"]))
+
+
+def resolve_operations(operations):
+    """
+    Collapse a list of {"op", "variant", "quantity"} operations into one final
+    change per variant, in request order, so a backend can apply the whole
+    batch with a handful of statements:
+    {"add": {variant_id: qty}, "set": {variant_id: qty}, "remove": {variant_id}}.
+    """
+    final = {}
+    for operation in operations:
+        variant_id, qty = operation["variant"], operation.get("quantity", 0)
+        kind, current = final.get(variant_id, ("add", 0))
+
+        if operation["op"] == "add":
+            final[variant_id] = ("set" if kind == "remove" else kind, (0 if kind == "remove" else current) + qty)
+        elif operation["op"] == "set" and qty > 0:
+            final[variant_id] = ("set", qty)
+        else:
+            final[variant_id] = ("remove", 0)
+
+    changes = {"add": {}, "set": {}, "remove": set()}
+    for variant_id, (kind, qty) in final.items():
+        if kind == "remove":
+            changes["remove"].add(variant_id)
+        else:
+            changes[kind][variant_id] = qty
+    return changes
+
+
+class DatabaseCartBackend:
+    """Carts live in the Cart/CartItem tables."""
+
+    def cart_queryset(self, user):
+        # subtotals and the total come from the database, variants ride along
+        # with the items, so the query count doesn't depend on the cart size
+        items = CartItem.objects.select_related("variant").annotate(
+            subtotal=F("quantity") * F("variant__price")
+        )
+        return (
+            Cart.objects.filter(user_id=user.id)
+            .annotate(total=Coalesce(
+                Sum(F("items__quantity") * F("items__variant__price")), Value(Decimal("0"))
+            ))
+            .prefetch_related(Prefetch("items", queryset=items))
+        )
+
+    def item_queryset(self, user):
+        return CartItem.objects.filter(cart__user_id=user.id).select_related("variant")
+
+    def get_cart(self, user):
+        return self.cart_queryset(user).first()
+
+    def create_cart(self, user):
+        cart, _ = Cart.objects.get_or_create(user_id=user.id)
+        return cart
+
+    def delete_cart(self, user):
+        Cart.objects.filter(user_id=user.id).delete()
+
+    def get_items(self, user):
+        return list(self.item_queryset(user))
+
+    def variant_ids(self, user):
+        return list(CartItem.objects.filter(cart__user_id=user.id).values_list("variant_id", flat=True))
+
+    def get_item(self, user, item_id):
+        return self.item_queryset(user).filter(pk=item_id).first()
+
+    def _upsert(self, cart, quantities, increment=True):
+        """
+        Write {variant_id: quantity} lines of a cart in one INSERT ... ON CONFLICT
+        on the (cart, variant) unique constraint. With ``increment`` the quantity
+        is added to an existing line, otherwise it replaces it. Returns the
+        resulting (id, variant_id, quantity) rows.
+        """
+        table = connection.ops.quote_name(CartItem._meta.db_table)
+        cart_id = CartItem._meta.get_field("cart").get_db_prep_value(cart.pk, connection)
+        new_quantity = f"{table}.quantity + excluded.quantity" if increment else "excluded.quantity"
+
+        sql = (
+            f"INSERT INTO {table} (cart_id, variant_id, quantity) "
+            f"VALUES {', '.join(['(%s, %s, %s)'] * len(quantities))} "
+            f"ON CONFLICT (cart_id, variant_id) DO UPDATE SET quantity = {new_quantity} "
+            f"RETURNING id, variant_id, quantity"
+        )
+        params = [value for variant_id, qty in quantities.items() for value in (cart_id, variant_id, qty)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def add_item(self, user, variant, quantity):
+        cart, _ = Cart.objects.get_or_create(user_id=user.id)
+        item_id, _, total_qty = self._upsert(cart, {variant.id: quantity})[0]
+        cart_changed(user.id)
+        return CartItem(id=item_id, cart=cart, variant=variant, quantity=total_qty)
+
+    def apply(self, user, changes):
+        """Apply a resolved batch (see resolve_operations) in one transaction."""
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user_id=user.id)
+            if changes["remove"]:
+                CartItem.objects.filter(cart=cart, variant_id__in=changes["remove"]).delete()
+            if changes["set"]:
+                self._upsert(cart, changes["set"], increment=False)
+            if changes["add"]:
+                self._upsert(cart, changes["add"])
+            cart_changed(user.id)
+
+        return self.get_items(user)
+
+    def update_item(self, user, item_id, variant, quantity):
+        item = self.get_item(user, item_id)
+        if item is None:
+            return None
+
+        item.variant = variant
+        item.quantity = quantity
+        item.save()
+        cart_changed(user.id)
+        return item
+
+    def remove_item(self, user, item_id):
+        deleted, _ = CartItem.objects.filter(cart__user_id=user.id, pk=item_id).delete()
+        cart_changed(user.id)
+        return deleted > 0
+
+    def flush(self, user):
+        pass
+
+    def flush_dirty(self, batch_size=500):
+        return 0
+
+    def checked_out(self, user_id, variant_ids):
+        # fulfillment already deleted the rows
+        cart_changed(user_id)
+
+
+class CartSnapshot:
+    """Read-only stand-in for a Cart whose lines are held in Redis."""
+
+    def __init__(self, id, created_at, items):
+        self.id = id
+        self.created_at = created_at
+        self.items = items
+        self.total = sum((item.subtotal for item in items), Decimal("0"))
+
+
+class RedisCartBackend:
+    """
+    Live carts are Redis hashes, one per user: a field per variant holding its
+    quantity, plus the cart id and creation time. Cart/CartItem rows are only
+    written by flush(), which checkout and the periodic flush task call.
+
+    Item ids exposed through the API are the variant ids, since that is what
+    identifies a line inside the hash.
+    """
+
+    dirty_key = "cart:dirty"
+
+    def _key(self, user_id):
+        return f"cart:{user_id}"
+
+    def _touch(self, pipe, user_id):
+        cart_changed(user_id)
+        key = self._key(user_id)
+        pipe.hsetnx(key, "_id", str(uuid.uuid4()))
+        pipe.hsetnx(key, "_created_at", timezone.now().isoformat())
+        pipe.expire(key, settings.CART_REDIS_TTL)
+        pipe.sadd(self.dirty_key, str(user_id))
+
+    def _load(self, user_id):
+        data = redis_client.hgetall(self._key(user_id))
+        quantities = {int(field): int(qty) for field, qty in data.items() if not field.startswith("_")}
+        return data, quantities
+
+    def _items(self, quantities):
+        variants = get_variants(quantities)
+        return [
+            self._item(variants[variant_id], qty)
+            for variant_id, qty in quantities.items()
+            if variant_id in variants
+        ]
+
+    def _item(self, variant, quantity):
+        item = CartItem(id=variant.id, variant=variant, quantity=quantity)
+        item.subtotal = variant.price * quantity
+        return item
+
+    def get_cart(self, user):
+        data, quantities = self._load(user.id)
+        if not data:
+            return None
+
+        return CartSnapshot(
+            id=data.get("_id"),
+            created_at=parse_datetime(data.get("_created_at", "")),
+            items=self._items(quantities),
+        )
+
+    def create_cart(self, user):
+        pipe = redis_client.pipeline()
+        self._touch(pipe, user.id)
+        pipe.execute()
+        return self.get_cart(user)
+
+    def delete_cart(self, user):
+        pipe = redis_client.pipeline()
+        pipe.delete(self._key(user.id))
+        pipe.sadd(self.dirty_key, str(user.id))
+        pipe.execute()
+        cart_changed(user.id)
+
+    def get_items(self, user):
+        _, quantities = self._load(user.id)
+        return self._items(quantities)
+
+    def variant_ids(self, user):
+        return [int(field) for field in redis_client.hkeys(self._key(user.id)) if not field.startswith("_")]
+
+    def get_item(self, user, item_id):
+        qty = redis_client.hget(self._key(user.id), str(item_id))
+        if qty is None:
+            return None
+
+        variant = get_variants([item_id]).get(int(item_id))
+        return self._item(variant, int(qty)) if variant else None
+
+    def add_item(self, user, variant, quantity):
+        pipe = redis_client.pipeline()
+        pipe.hincrby(self._key(user.id), str(variant.id), quantity)
+        self._touch(pipe, user.id)
+        total_qty = pipe.execute()[0]
+        return self._item(variant, total_qty)
+
+    def apply(self, user, changes):
+        """Apply a resolved batch (see resolve_operations) in one MULTI/EXEC."""
+        key = self._key(user.id)
+        pipe = redis_client.pipeline(transaction=True)
+        if changes["remove"]:
+            pipe.hdel(key, *[str(variant_id) for variant_id in changes["remove"]])
+        if changes["set"]:
+            pipe.hset(key, mapping={str(variant_id): qty for variant_id, qty in changes["set"].items()})
+        for variant_id, qty in changes["add"].items():
+            pipe.hincrby(key, str(variant_id), qty)
+        self._touch(pipe, user.id)
+        pipe.execute()
+
+        return self.get_items(user)
+
+    def update_item(self, user, item_id, variant, quantity):
+        key = self._key(user.id)
+        if not redis_client.hexists(key, str(item_id)):
+            return None
+
+        pipe = redis_client.pipeline()
+        if variant.id != int(item_id):
+            pipe.hdel(key, str(item_id))
+        pipe.hset(key, str(variant.id), quantity)
+        self._touch(pipe, user.id)
+        pipe.execute()
+        return self._item(variant, quantity)
+
+    def remove_item(self, user, item_id):
+        pipe = redis_client.pipeline()
+        pipe.hdel(self._key(user.id), str(item_id))
+        pipe.sadd(self.dirty_key, str(user.id))
+        cart_changed(user.id)
+        return pipe.execute()[0] > 0
+
+    def flush(self, user):
+        self._flush(user.id)
+
+    def _flush(self, user_id):
+        """Write the Redis cart through to the Cart/CartItem tables."""
+        # cleared first: a change made while we write marks the cart dirty again
+        redis_client.srem(self.dirty_key, str(user_id))
+        data, quantities = self._load(user_id)
+        existing = set(
+            ServiceVariant.objects.filter(pk__in=list(quantities)).values_list("pk", flat=True)
+        )
+
+        with transaction.atomic():
+            if not data:
+                Cart.objects.filter(user_id=user_id).delete()
+                return
+
+            cart, _ = Cart.objects.get_or_create(user_id=user_id, defaults={"id": data["_id"]})
+            CartItem.objects.filter(cart=cart).delete()
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, variant_id=variant_id, quantity=qty)
+                for variant_id, qty in quantities.items()
+                if variant_id in existing
+            ])
+
+    def flush_dirty(self, batch_size=500):
+        user_ids = redis_client.srandmember(self.dirty_key, batch_size) or []
+        for user_id in user_ids:
+            self._flush(user_id)
+        return len(user_ids)
+
+    def checked_out(self, user_id, variant_ids):
+        if variant_ids:
+            redis_client.hdel(self._key(user_id), *[str(pk) for pk in variant_ids])
+            cart_changed(user_id)
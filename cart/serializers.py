@@ -1,9 +1,11 @@
 # carts/serializers.py
 from rest_framework import serializers
 from .models import Cart, CartItem
-from services.models import ServiceVariant
+from services.cache import get_variants
+from services.serializers import CachedVariantField
 
 class CartItemSerializer(serializers.ModelSerializer):
+    variant = CachedVariantField()
     variant_name = serializers.ReadOnlyField(source="variant.name")
     price = serializers.ReadOnlyField(source="variant.price")
     subtotal = serializers.SerializerMethodField()
@@ -13,6 +15,9 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "variant", "variant_name", "price", "quantity", "subtotal"]
 
     def get_subtotal(self, obj):
+        # annotated by CartViewSet; computed for items that were just written
+        if hasattr(obj, "subtotal"):
+            return obj.subtotal
         return obj.variant.price * obj.quantity
 
 
@@ -25,4 +30,35 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ["id", "items", "total", "created_at"]
 
     def get_total(self, cart):
+        if hasattr(cart, "total"):
+            return cart.total
         return sum(item.variant.price * item.quantity for item in cart.items.all())
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["add", "set", "remove"])
+    variant = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] == "add" and not attrs.get("quantity"):
+            raise serializers.ValidationError("Adding requires a quantity of at least 1.")
+        if attrs["op"] == "set" and "quantity" not in attrs:
+            raise serializers.ValidationError("Setting requires a quantity.")
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    # the lines go into one upsert with 3 parameters each, which has to stay
+    # under the backend's parameter limit (999 on SQLite)
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=300)
+
+    def validate_operations(self, operations):
+        # every referenced variant is checked with a single cache lookup
+        variant_ids = {operation["variant"] for operation in operations}
+        missing = variant_ids - set(get_variants(variant_ids))
+        if missing:
+            raise serializers.ValidationError(
+                f"Invalid variant ids: {', '.join(str(pk) for pk in sorted(missing))}"
+            )
+        return operations
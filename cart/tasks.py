@@ -0,0 +1,7 @@
+from celery import shared_task
+from .backends import get_cart_backend
+
+
+@shared_task
+def flush_carts_task():
+    return get_cart_backend().flush_dirty()
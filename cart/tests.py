@@ -1,3 +1,73 @@
-from django.test import TestCase
+from decimal import Decimal
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from common.testing import create_variants
+from users.models import User
+from .models import Cart, CartItem
 
-# Create your tests here.
+
+class CartReadQueryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.variants = create_variants(500, price=Decimal("2.50"))
+
+    def assert_cart_queries(self, lines):
+        user = User.objects.create(email=f"customer-{lines}@example.com")
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, variant=variant, quantity=2) for variant in self.variants[:lines]
+        ])
+        self.client.force_authenticate(user)
+
+        # the variant ids the cached response depends on, the cart and its items
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/carts/")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()[0]
+        self.assertEqual(len(body["items"]), lines)
+        self.assertEqual(Decimal(str(body["items"][0]["subtotal"])), Decimal("5.00"))
+        self.assertEqual(Decimal(str(body["total"])), Decimal("5.00") * lines)
+
+    def test_single_line_cart(self):
+        self.assert_cart_queries(1)
+
+    def test_fifty_line_cart(self):
+        self.assert_cart_queries(50)
+
+    def test_five_hundred_line_cart(self):
+        self.assert_cart_queries(500)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS="locmem")
+class CartCacheTests(APITestCase):
+    def setUp(self):
+        caches["locmem"].clear()
+        self.variant, = create_variants(price=Decimal("15.00"))
+        user = User.objects.create(email="customer@example.com")
+        CartItem.objects.create(cart=Cart.objects.create(user=user), variant=self.variant, quantity=2)
+        self.client.force_authenticate(user)
+
+    def test_price_change_invalidates_the_cached_cart(self):
+        self.client.get("/api/v1/carts/")
+        self.assertEqual(self.client.get("/api/v1/carts/")["X-Cache"], "hit")
+
+        self.variant.price = Decimal("59.50")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.save()
+        response = self.client.get("/api/v1/carts/")
+
+        self.assertEqual(response["X-Cache"], "miss")
+        self.assertEqual(Decimal(str(response.json()[0]["total"])), Decimal("119.00"))
+
+
+class CartBatchTests(APITestCase):
+    def test_too_many_operations_are_rejected(self):
+        self.client.force_authenticate(User.objects.create(email="customer@example.com"))
+        operations = [{"op": "add", "variant": pk, "quantity": 1} for pk in range(1, 302)]
+
+        response = self.client.post("/api/v1/cart-items/batch/", {"operations": operations}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("no more than 300", str(response.json()["operations"]))
@@ -1,47 +1,130 @@
 # carts/views.py
+from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.response import Response
+from common.cache import CachedResponseMixin
+from users.authentication import ClaimsJWTAuthentication
+from .backends import get_cart_backend, resolve_operations
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer
-from services.models import ServiceVariant
+from .serializers import CartSerializer, CartItemSerializer, CartBatchSerializer
 
-class CartViewSet(ModelViewSet):
+# Both viewsets go through the configured cart backend (settings.CART_BACKEND)
+# so carts can live in the database or in Redis behind the same API.
+
+
+class CartViewSet(CachedResponseMixin, ModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    cache_name = "carts"
+
+    def cache_namespaces(self):
+        # the cart shows its variants' names and prices, which vendors change
+        variant_ids = sorted(get_cart_backend().variant_ids(self.request.user))
+        return [f"cart:{self.request.user.id}", *[f"variant:{pk}" for pk in variant_ids]]
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user_id=self.request.user.id)
+
+    def get_cart(self):
+        cart = get_cart_backend().get_cart(self.request.user)
+        if cart is None or str(cart.id) != str(self.kwargs["pk"]):
+            raise NotFound()
+        return cart
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(self._list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(self._retrieve, request, *args, **kwargs)
+
+    def _list(self, request, *args, **kwargs):
+        cart = get_cart_backend().get_cart(request.user)
+        carts = [cart] if cart is not None else []
+        return Response(self.get_serializer(carts, many=True).data)
+
+    def _retrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_cart()).data)
+
+    def update(self, request, *args, **kwargs):
+        # a cart has no writable fields of its own
+        return self.retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         if self.request.user.role != "customer":
             raise PermissionDenied("Only customers can have a cart")
-        serializer.save(user=self.request.user)
+        serializer.instance = get_cart_backend().create_cart(self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        self.get_cart()
+        get_cart_backend().delete_cart(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class CartItemViewSet(ModelViewSet):
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get_queryset(self):
-        return CartItem.objects.filter(cart__user=self.request.user)
+        return CartItem.objects.filter(cart__user_id=self.request.user.id).select_related("variant")
+
+    def get_item(self):
+        try:
+            item = get_cart_backend().get_item(self.request.user, self.kwargs["pk"])
+        except (TypeError, ValueError):
+            item = None
+        if item is None:
+            raise NotFound()
+        return item
+
+    def list(self, request, *args, **kwargs):
+        items = get_cart_backend().get_items(request.user)
+        return Response(self.get_serializer(items, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_item()).data)
 
     def perform_create(self, serializer):
         user = self.request.user
         if user.role != "customer":
             raise PermissionDenied("Only customers can add to cart")
 
-        cart, _ = Cart.objects.get_or_create(user=user)
         variant = serializer.validated_data["variant"]
         qty = serializer.validated_data["quantity"]
 
-        item, created = CartItem.objects.get_or_create(cart=cart, variant=variant)
+        serializer.instance = get_cart_backend().add_item(user, variant, qty)
+
+    def update(self, request, *args, **kwargs):
+        item = self.get_item()
+        serializer = self.get_serializer(item, data=request.data, partial=kwargs.pop("partial", False))
+        serializer.is_valid(raise_exception=True)
+
+        item = get_cart_backend().update_item(
+            request.user,
+            item.id,
+            serializer.validated_data.get("variant", item.variant),
+            serializer.validated_data.get("quantity", item.quantity),
+        )
+        return Response(self.get_serializer(item).data)
+
+    def destroy(self, request, *args, **kwargs):
+        item = self.get_item()
+        get_cart_backend().remove_item(request.user, item.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Add, set or remove many variants in one request and one transaction."""
+        if request.user.role != "customer":
+            raise PermissionDenied("Only customers can add to cart")
 
-        if not created:
-            item.quantity += qty
-            item.save()
-        else:
-            item.quantity = qty
-            item.save()
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        serializer.instance = item
+        changes = resolve_operations(serializer.validated_data["operations"])
+        items = get_cart_backend().apply(request.user, changes)
+        return Response(CartItemSerializer(items, many=True).data)
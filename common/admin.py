@@ -1,3 +1,59 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
 
-# Register your models here.
+
+def estimated_count(model, using="default"):
+    """
+    Row count of ``model``'s table from the planner statistics (pg_class on
+    Postgres, sqlite_stat1 after ANALYZE on SQLite), or None when the backend
+    has no estimate.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            except DatabaseError:
+                # ANALYZE has never run
+                return None
+        else:
+            return None
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator for big tables: an unfiltered list uses the planner's
+    row estimate instead of a full COUNT(*). Filtered lists and tables smaller
+    than ``exact_below`` rows are still counted exactly.
+    """
+
+    exact_below = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, "query") and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base for changelists of tables that grow without bound."""
+
+    paginator = EstimatedCountPaginator
+    # the "N total" link would run an exact COUNT(*) of the whole table
+    show_full_result_count = False
@@ -0,0 +1,152 @@
+"""
+Cache-aside layer for GET responses.
+
+A cached response is keyed by the view, the caller's scope (role and user),
+the full path and the current version of every namespace it depends on, e.g.
+"vendor:12" or "catalog". Writes bump those versions (from signals, or
+explicitly where a bulk write skips them), which orphans exactly the entries
+built on the old version; they then age out of the cache.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+# headers stored with the payload, the catalog's validators among them
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+# every view using CachedResponseMixin, by cache_name, for the stats command
+CACHED_VIEWS = set()
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f"resp:ns:{namespace}"
+
+
+def namespace_versions(namespaces):
+    cache = response_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # a fresh stamp rather than 1, so an evicted version can't revive old entries
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key) or 0
+    return [str(versions[key]) for key in keys]
+
+
+def bump_namespaces(namespaces):
+    """Invalidate every cached response that depends on one of ``namespaces``."""
+    namespaces = set(namespaces)
+    if namespaces:
+        response_cache().set_many(
+            {_version_key(namespace): time.time_ns() for namespace in namespaces}, timeout=None
+        )
+
+
+def count(view_name, outcome):
+    cache = response_cache()
+    key = f"resp:stats:{view_name}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def stats(reset=False):
+    """{view name: (hits, misses)} for every cached view."""
+    cache = response_cache()
+    keys = [f"resp:stats:{name}:{outcome}" for name in CACHED_VIEWS for outcome in ("hit", "miss")]
+    counts = cache.get_many(keys)
+    if reset:
+        cache.delete_many(keys)
+    return {
+        name: (counts.get(f"resp:stats:{name}:hit", 0), counts.get(f"resp:stats:{name}:miss", 0))
+        for name in sorted(CACHED_VIEWS)
+    }
+
+
+class CachedResponseMixin:
+    """
+    Serves list and retrieve from the response cache. Views set cache_name and
+    override cache_namespaces() to name what their responses depend on; by
+    default the scope is the caller's role and user id. A view that defines
+    list or retrieve itself wraps its handler with _cached().
+    """
+
+    cache_name = None
+    cache_timeout = None
+    cached_actions = ("list", "retrieve")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_name:
+            CACHED_VIEWS.add(cls.cache_name)
+
+    def cache_scope(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return "public"
+        if user.role == "admin":
+            # admins all see the same thing
+            return "admin"
+        return f"{user.role}:{user.id}"
+
+    def cache_namespaces(self):
+        return []
+
+    def cache_key(self):
+        request = self.request
+        versions = namespace_versions(self.cache_namespaces())
+        # a cart depends on one namespace per variant, so the versions are hashed too
+        versions = hashlib.md5(".".join(versions).encode()).hexdigest()
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return f"resp:{self.cache_name}:{self.cache_scope()}:{versions}:{path}"
+
+    def _cached(self, handler, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        cache = response_cache()
+        key = self.cache_key()
+        cached = cache.get(key)
+
+        if cached is not None:
+            count(self.cache_name, "hit")
+            headers = cached["headers"]
+            last_modified = parse_http_date_safe(headers.get("Last-Modified", ""))
+            response = get_conditional_response(
+                request, etag=headers.get("ETag"), last_modified=last_modified
+            ) or Response(cached["data"])
+            for name, value in headers.items():
+                response[name] = value
+            response["X-Cache"] = "hit"
+            return response
+
+        count(self.cache_name, "miss")
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(
+                key,
+                {
+                    "data": response.data,
+                    "headers": {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+                },
+                timeout=self.cache_timeout or settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        response["X-Cache"] = "miss"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from cart.models import Cart, CartItem
+from payment.models import StockReservation
+from payment.reservations import reserve_cart, release_reservations
+from services.listings import refresh_listings
+from services.models import Service, ServiceListing, ServiceVariant
+from users.models import User
+from vendors.models import VendorProfile
+
+
+def _worker(args):
+    user_id, seconds, write_ratio, debug = args
+    # forked from the command, so it opens its own connection with the profile's options
+    settings.DEBUG = debug
+    user = User.objects.get(pk=user_id)
+    rng = random.Random(str(user_id))
+    stats = Counter()
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                reserve_cart(user)
+                release_reservations(StockReservation.objects.filter(user_id=user.id))
+                stats["writes"] += 1
+            else:
+                list(ServiceListing.objects.filter(is_active=True).order_by("min_price")[:20])
+                stats["reads"] += 1
+        except OperationalError as exc:
+            stats["locked" if "locked" in str(exc) else "errors"] += 1
+
+    connections.close_all()
+    return stats
+
+
+class Command(BaseCommand):
+    help = "Compare checkout/catalog throughput and lock errors with and without the SQLite production profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", default="1,4,16")
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--write-ratio", type=float, default=0.3,
+                            help="Share of operations that reserve and release a cart.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark needs the SQLite backend.")
+        processes = [int(n) for n in options["processes"].split(",")]
+
+        tmp_dir = tempfile.mkdtemp()
+        seeded = os.path.join(tmp_dir, "seed.sqlite3")
+        old_name = connection.settings_dict["NAME"]
+        connection.settings_dict["TEST"]["NAME"] = seeded
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            user_ids = self.seed(max(processes))
+            connections.close_all()
+
+            profiles = (
+                ("development", {}, True),
+                ("production", settings.SQLITE_PRODUCTION_OPTIONS, False),
+            )
+            self.stdout.write("profile     | processes | ops/s  | writes/s | locked | other errors")
+            for name, db_options, debug in profiles:
+                for count in processes:
+                    path = os.path.join(tmp_dir, f"{name}-{count}.sqlite3")
+                    shutil.copy(seeded, path)
+                    self.run_profile(name, path, db_options, debug, user_ids[:count], options)
+        finally:
+            connections.close_all()
+            connection.settings_dict["OPTIONS"] = {}
+            connection.settings_dict["NAME"] = seeded
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def seed(self, buyers):
+        owner = User.objects.create(email="bench-vendor@example.com", role="vendor")
+        vendor = VendorProfile.objects.create(user=owner, business_name="Bench", address="-")
+        services = Service.objects.bulk_create([
+            Service(vendor=vendor, name=f"Service {i}", description="-") for i in range(50)
+        ])
+        variants = ServiceVariant.objects.bulk_create([
+            ServiceVariant(
+                service=service, name=f"Variant {i}", price=Decimal(10 + i),
+                estimated_minutes=30, stock=1_000_000,
+            )
+            for i, service in enumerate(services)
+        ])
+        refresh_listings([service.pk for service in services])
+
+        users = User.objects.bulk_create([
+            User(email=f"bench-{i}@example.com", role="customer") for i in range(buyers)
+        ])
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        # every buyer wants the same few variants, the worst case for locking
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, variant=variant, quantity=1) for cart in carts for variant in variants[:3]
+        ])
+        return [user.pk for user in users]
+
+    def run_profile(self, name, path, db_options, debug, user_ids, options):
+        connection.settings_dict["NAME"] = path
+        connection.settings_dict["OPTIONS"] = db_options
+        connections.close_all()
+
+        jobs = [(user_id, options["seconds"], options["write_ratio"], debug) for user_id in user_ids]
+        started = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(len(jobs)) as pool:
+            stats = sum(pool.map(_worker, jobs), Counter())
+        elapsed = time.perf_counter() - started
+
+        ops = stats["reads"] + stats["writes"]
+        self.stdout.write(
+            f"{name:<11} | {len(jobs):>9} | {ops / elapsed:>6.0f} | {stats['writes'] / elapsed:>8.0f} "
+            f"| {stats['locked']:>6} | {stats['errors']:>12}"
+        )
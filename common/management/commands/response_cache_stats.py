@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from common.cache import stats
+
+
+class Command(BaseCommand):
+    help = "Show hits and misses of the GET response cache per view."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after reading them.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("view     | hits    | misses  | hit rate")
+        for name, (hits, misses) in stats(reset=options["reset"]).items():
+            total = hits + misses
+            rate = f"{hits / total:.1%}" if total else "-"
+            self.stdout.write(f"{name:<8} | {hits:>7} | {misses:>7} | {rate:>8}")
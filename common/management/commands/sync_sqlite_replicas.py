@@ -0,0 +1,31 @@
+import sqlite3
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the local replica files (SQLITE_REPLICAS)."
+
+    def handle(self, *args, **options):
+        if not settings.SQLITE_REPLICA_FILES:
+            raise CommandError("No SQLite replicas configured, set SQLITE_REPLICAS.")
+
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("The primary database isn't SQLite.")
+
+        source = sqlite3.connect(str(primary.settings_dict["NAME"]))
+        try:
+            for alias, path in settings.SQLITE_REPLICA_FILES.items():
+                # the online backup API gives a consistent copy while the primary takes writes
+                target = sqlite3.connect(str(path))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"{alias}: {path}")
+        finally:
+            source.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Synced {len(settings.SQLITE_REPLICA_FILES)} replica(s)"))
@@ -0,0 +1,75 @@
+import hashlib
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from redis.exceptions import RedisError
+from .redis import redis_client
+from .routers import pick_replica, read_alias
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _sticky_key(request):
+    # the user isn't authenticated yet (DRF does that in the view), so the
+    # credentials they send stand in for them
+    credentials = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return "db:sticky:" + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def _is_sticky(key):
+    try:
+        return bool(redis_client.exists(key))
+    except RedisError:
+        # can't tell, the primary is always up to date
+        return True
+
+
+def _stick(key):
+    try:
+        redis_client.set(key, 1, ex=settings.REPLICA_STICKY_SECONDS)
+    except RedisError:
+        pass
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe-method requests read from a replica (see common.routers), while
+    writes and the requests of anyone who wrote in the last
+    REPLICA_STICKY_SECONDS stay on the primary, so users read their own
+    writes. Every response reports its queries per database alias in the
+    X-DB-Queries header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = _sticky_key(request) if settings.DATABASE_REPLICAS else None
+        alias = None
+        if settings.DATABASE_REPLICAS and request.method in SAFE_METHODS and not (key and _is_sticky(key)):
+            alias = pick_replica()
+
+        counts = Counter()
+        token = read_alias.set(alias)
+        try:
+            with ExitStack() as stack:
+                for db in connections:
+                    stack.enter_context(connections[db].execute_wrapper(self._counter(counts, db)))
+                response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+        if key and request.method not in SAFE_METHODS and response.status_code < 400:
+            _stick(key)
+
+        response["X-DB-Queries"] = ", ".join(f"{db}={counts[db]}" for db in connections) or "none"
+        return response
+
+    def _counter(self, counts, alias):
+        def count(execute, sql, params, many, context):
+            counts[alias] += 1
+            return execute(sql, params, many, context)
+        return count
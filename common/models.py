@@ -1,3 +1,17 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class OutboxEvent(models.Model):
+    """
+    An event written in the same transaction as the change it describes and
+    relayed to a Redis stream by common.outbox.relay_outbox, which deletes it.
+    """
+
+    type = models.CharField(max_length=100)  # e.g. "order.created"
+    key = models.CharField(max_length=64)  # id of the object the event is about
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.type} ({self.key})"
@@ -0,0 +1,70 @@
+"""
+Transactional outbox. Code that changes state writes its events with emit()
+inside the same transaction, so an event exists exactly when the change
+committed. relay_outbox() then moves them to a Redis stream.
+"""
+import json
+from django.conf import settings
+from redis.exceptions import LockError
+from common.redis import redis_client
+from .models import OutboxEvent
+
+
+def emit(events):
+    """Write (type, key, payload) events to the outbox with one INSERT."""
+    if events:
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(type=type, key=str(key), payload=payload) for type, key, payload in events
+        ])
+
+
+def relay_outbox(batch_size=None):
+    """
+    Append outbox events to settings.OUTBOX_STREAM in id order, a batch at a
+    time, deleting every batch once it is in the stream. Returns how many were
+    relayed.
+
+    Delivery to the stream is at least once: if the process dies between the
+    XADD and the DELETE the batch goes out again, so consumers dedupe on
+    event_id. Only one relay runs at a time.
+    """
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    lock = redis_client.lock("outbox:relay", timeout=5 * 60)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    relayed = 0
+    try:
+        while True:
+            events = list(OutboxEvent.objects.order_by("pk")[:batch_size])
+            if not events:
+                break
+
+            pipe = redis_client.pipeline(transaction=False)
+            for event in events:
+                pipe.xadd(
+                    settings.OUTBOX_STREAM,
+                    {
+                        "event_id": event.pk,
+                        "type": event.type,
+                        "key": event.key,
+                        "payload": json.dumps(event.payload),
+                        "created_at": event.created_at.isoformat(),
+                    },
+                    maxlen=settings.OUTBOX_STREAM_MAXLEN,
+                    approximate=True,
+                )
+            pipe.execute()
+
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+            relayed += len(events)
+            if len(events) < batch_size:
+                break
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # held past its timeout; another relay may already own it
+            pass
+
+    return relayed
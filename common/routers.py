@@ -0,0 +1,36 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# replica the current request may read from, None means the primary
+read_alias = ContextVar("read_alias", default=None)
+
+
+def pick_replica():
+    return random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+class ReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to the replica chosen for the
+    current request by common.middleware.ReplicaRoutingMiddleware, except
+    inside a transaction, where they have to see the transaction's writes.
+    Anything outside a request (tasks, commands) stays on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from cart.models import Cart
+from orders.models import RepairOrder
+from services.models import Service, ServiceVariant
+from vendors.models import VendorProfile
+from .cache import bump_namespaces
+
+
+def schedule_bump(namespaces):
+    # after commit, or a reader could cache the old rows again in between
+    namespaces = list(namespaces)
+    transaction.on_commit(lambda: bump_namespaces(namespaces))
+
+
+@receiver(post_save, sender=VendorProfile)
+@receiver(post_delete, sender=VendorProfile)
+def invalidate_vendor(sender, instance, **kwargs):
+    schedule_bump(["vendors", f"vendor:{instance.pk}"])
+
+
+@receiver(post_save, sender=RepairOrder)
+@receiver(post_delete, sender=RepairOrder)
+def invalidate_order(sender, instance, **kwargs):
+    schedule_bump([f"order:{instance.pk}"])
+
+
+# bulk updates of variants bump in services.serializers
+@receiver(post_save, sender=ServiceVariant)
+@receiver(post_delete, sender=ServiceVariant)
+def invalidate_variant(sender, instance, **kwargs):
+    schedule_bump([f"variant:{instance.pk}"])
+
+
+# cart items are bulk written and deleted, so cart.backends bumps for them;
+# a receiver here would stop Django from fast-deleting them
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def invalidate_cart(sender, instance, **kwargs):
+    schedule_bump([f"cart:{instance.user_id}"])
+
+
+# saves reach the catalog through services.listings.refresh_listings, a
+# deleted service only drops its listing row
+@receiver(post_delete, sender=Service)
+def invalidate_catalog(sender, instance, **kwargs):
+    schedule_bump(["catalog"])
@@ -0,0 +1,7 @@
+from celery import shared_task
+from .outbox import relay_outbox
+
+
+@shared_task
+def relay_outbox_task():
+    return relay_outbox()
@@ -0,0 +1,19 @@
+"""Fixtures shared by the apps' tests."""
+from decimal import Decimal
+from services.models import Service, ServiceVariant
+from users.models import User
+from vendors.models import VendorProfile
+
+
+def create_vendor(email="vendor@example.com"):
+    owner = User.objects.create(email=email, role="vendor")
+    return VendorProfile.objects.create(user=owner, business_name="Fix It", address="-")
+
+
+def create_variants(count=1, price=Decimal("10.00"), stock=10, vendor=None):
+    """``count`` variants of one new service, of ``vendor`` or a new one."""
+    service = Service.objects.create(vendor=vendor or create_vendor(), name="Screen repair", description="-")
+    return ServiceVariant.objects.bulk_create([
+        ServiceVariant(service=service, name=f"Variant {i}", price=price, estimated_minutes=30, stock=stock)
+        for i in range(count)
+    ])
@@ -14,7 +14,6 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
-import stripe
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,8 +25,12 @@ load_dotenv(os.path.join(BASE_DIR, ".env"))
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-)vaxa-azh^t%r8&162h4yaur)j+9*eqkf*x2_ll_sxxo=#&_&6'
 
+# "production" tunes the SQLite database for concurrent writers, see DATABASES
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "development")
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also keeps every query in memory, so the production profile turns it off
+DEBUG = os.environ.get("DJANGO_DEBUG", "0" if SQLITE_PROFILE == "production" else "1") == "1"
 ALLOWED_HOSTS = [
 "*"
 ]
@@ -41,6 +44,28 @@ CELERY_BROKER_URL = "redis://127.0.0.1:6379/1"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_BACKEND = "django-db"
+CELERY_BEAT_SCHEDULE = {
+    "release-expired-reservations": {
+        "task": "payment.tasks.release_expired_reservations_task",
+        "schedule": 60.0,
+    },
+    "flush-carts": {
+        "task": "cart.tasks.flush_carts_task",
+        "schedule": 300.0,
+    },
+    "reconcile-inventory": {
+        "task": "services.tasks.reconcile_inventory_task",
+        "schedule": 60.0,
+    },
+    "refresh-stale-listings": {
+        "task": "services.tasks.refresh_stale_listings_task",
+        "schedule": 30.0,
+    },
+    "relay-outbox": {
+        "task": "common.tasks.relay_outbox_task",
+        "schedule": 5.0,
+    },
+}
 # Application definition
 
 INSTALLED_APPS = [
@@ -58,11 +83,13 @@ INSTALLED_APPS = [
     'services',
     'common',
     'cart',
+    'search',
     "django_celery_results",
     
 ]
 
 MIDDLEWARE = [
+    'common.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -106,6 +133,43 @@ DATABASES = {
     }
 }
 
+# Applied on every new connection by the production profile: WAL lets readers
+# run alongside the writer, IMMEDIATE takes the write lock when a transaction
+# starts (so it waits on busy_timeout instead of failing with "database is
+# locked" when a read lock can't be upgraded), NORMAL only syncs at checkpoints.
+SQLITE_PRODUCTION_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA busy_timeout=5000;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA cache_size=-65536;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+}
+if SQLITE_PROFILE == "production":
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+
+# Read replicas. Locally, SQLITE_REPLICAS="replica1.sqlite3,replica2.sqlite3"
+# adds a read-only alias per file, refreshed with `manage.py sync_sqlite_replicas`.
+# For other engines add the replica aliases to DATABASES directly.
+SQLITE_REPLICA_FILES = {
+    f"replica{index}": BASE_DIR / name
+    for index, name in enumerate(filter(None, os.environ.get("SQLITE_REPLICAS", "").split(",")), start=1)
+}
+for alias, path in SQLITE_REPLICA_FILES.items():
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{path}?mode=ro",
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['common.routers.ReplicaRouter']
+# seconds a user's reads stay on the primary after they wrote
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -162,6 +226,10 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('JWT',),
    "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
+   # tokens carry role and vendor_profile_id, see users.authentication
+   "TOKEN_OBTAIN_SERIALIZER": "users.serializers.ClaimsTokenObtainPairSerializer",
+   "TOKEN_REFRESH_SERIALIZER": "users.serializers.ClaimsTokenRefreshSerializer",
+   "TOKEN_USER_CLASS": "users.authentication.ClaimsUser",
 }
 
 DJOSER = {
@@ -179,8 +247,37 @@ STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY")
 STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY")
 STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
 
-
-stripe.api_key = os.environ.get("STRIPE_API_KEY")
+# seconds a checkout holds its stock before it is given back
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Where available stock is counted: "services.inventory.DatabaseInventory" or
+# "services.inventory.RedisInventory" (written back to the DB by reconciliation)
+INVENTORY_BACKEND = os.environ.get("INVENTORY_BACKEND", "services.inventory.DatabaseInventory")
+INVENTORY_RECONCILE_BATCH_SIZE = 500
+# variants whose stock changed, refreshed per pass of
+# services.listings.refresh_stale_listings
+LISTING_REFRESH_BATCH_SIZE = 500
+
+# common.outbox: the Redis stream order and payment events are relayed to
+OUTBOX_STREAM = "events"
+OUTBOX_STREAM_MAXLEN = 100_000
+OUTBOX_RELAY_BATCH_SIZE = 500
+
+PAYPAL_MODE = os.environ.get("PAYPAL_MODE", "sandbox")
+PAYPAL_CLIENT_ID = os.environ.get("PAYPAL_CLIENT_ID")
+PAYPAL_CLIENT_SECRET = os.environ.get("PAYPAL_CLIENT_SECRET")
+
+# payment.providers: "payment.providers.StripeProvider", "...PayPalProvider",
+# or "...FakeProvider", which stays in process for load tests and offline work
+PAYMENT_PROVIDER = os.environ.get("PAYMENT_PROVIDER", "payment.providers.StripeProvider")
+PAYMENT_HTTP_TIMEOUT = (3.05, 10)  # connect, read
+PAYMENT_HTTP_POOL_SIZE = 20
+PAYMENT_RETRIES = 2
+PAYMENT_RETRY_BACKOFF = 0.25  # seconds, doubled on every retry
+PAYMENT_BREAKER_THRESHOLD = 5
+PAYMENT_BREAKER_RESET_SECONDS = 30
+PAYMENT_FAKE_LATENCY = float(os.environ.get("PAYMENT_FAKE_LATENCY", "0"))
+PAYMENT_CURRENCY = "usd"
 
 CACHES = {
     "default": {
@@ -188,8 +285,31 @@ CACHES = {
         "LOCATION": "redis://127.0.0.1:6379/1",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # a Redis outage turns cache reads into misses instead of errors
+            "IGNORE_EXCEPTIONS": True,
         }
-    }
+    },
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
 }
 
+# cache used by common.cache for GET responses; "locmem" keeps it in process,
+# e.g. for tests or running without Redis
+RESPONSE_CACHE_ALIAS = os.environ.get("RESPONSE_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+
+# cache holding each user's started checkout (payment and client secret)
+CHECKOUT_CACHE_ALIAS = os.environ.get("CHECKOUT_CACHE_ALIAS", "default")
+
 REDIS_URL = "redis://127.0.0.1:6379/1"
+
+# services.cache: variant/service/vendor lookups, per process and in Redis
+HOT_CACHE_TTL = 10 * 60
+HOT_CACHE_LOCAL_SIZE = 10_000
+HOT_CACHE_LOCAL_TTL = 30
+
+# Where live carts are kept: "cart.backends.DatabaseCartBackend" or
+# "cart.backends.RedisCartBackend" (written through to the DB at checkout)
+CART_BACKEND = os.environ.get("CART_BACKEND", "cart.backends.DatabaseCartBackend")
+CART_REDIS_TTL = 30 * 24 * 60 * 60
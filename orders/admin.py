@@ -1,9 +1,24 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from common.admin import LargeTableAdmin
 from .models import RepairOrder
+from .transitions import TRANSITIONS, transition
+
+
+def transition_action(from_status, to_status):
+    def action(modeladmin, request, queryset):
+        # one UPDATE; selected orders in another status are left alone
+        moved = transition(queryset, from_status, to_status)
+        modeladmin.message_user(
+            request, f"{len(moved)} {from_status} order(s) moved to {to_status}.", messages.SUCCESS
+        )
+
+    action.__name__ = f"{from_status}_to_{to_status}"
+    action.short_description = f"Move selected {from_status} orders to {to_status}"
+    return action
 
 
 @admin.register(RepairOrder)
-class RepairOrderAdmin(admin.ModelAdmin):
+class RepairOrderAdmin(LargeTableAdmin):
     list_display = (
         "order_id",
         "customer_email",
@@ -14,6 +29,8 @@ class RepairOrderAdmin(admin.ModelAdmin):
         "total_amount",
         "created_at",
     )
+    # every computed column below reads from these joins
+    list_select_related = ("customer", "vendor", "variant__service")
 
     list_filter = ("status", "created_at", "vendor")
     search_fields = (
@@ -24,6 +41,12 @@ class RepairOrderAdmin(admin.ModelAdmin):
     )
 
     readonly_fields = ("order_id", "total_amount", "created_at", "updated_at")
+    # status changes go through the transition table
+    actions = [
+        transition_action(from_status, to_status)
+        for from_status, targets in TRANSITIONS.items()
+        for to_status in sorted(targets)
+    ]
 
     ordering = ("-created_at",)
 
@@ -43,3 +66,8 @@ class RepairOrderAdmin(admin.ModelAdmin):
     vendor_name.short_description = "Vendor"
     service_name.short_description = "Service"
     variant_name.short_description = "Variant"
+
+    customer_email.admin_order_field = "customer__email"
+    vendor_name.admin_order_field = "vendor__business_name"
+    service_name.admin_order_field = "variant__service__name"
+    variant_name.admin_order_field = "variant__name"
@@ -0,0 +1,25 @@
+"""Outbox events for orders, see common.outbox."""
+
+
+def order_payload(order):
+    return {
+        "id": order.pk,
+        "order_id": order.order_id,
+        "customer_id": order.customer_id,
+        "vendor_id": order.vendor_id,
+        "variant_id": order.variant_id,
+        "status": order.status,
+        "total_amount": order.total_amount,
+        "created_at": order.created_at,
+    }
+
+
+def created_events(orders):
+    return [("order.created", order.order_id, order_payload(order)) for order in orders]
+
+
+def status_changed_events(orders, from_status):
+    return [
+        ("order.status_changed", order.order_id, {**order_payload(order), "from_status": from_status})
+        for order in orders
+    ]
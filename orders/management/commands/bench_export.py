@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from orders.models import RepairOrder
+from orders.views import RepairOrderViewSet
+from services.models import Service, ServiceVariant
+from users.models import User
+from vendors.models import VendorProfile
+
+
+def _rss_mb():
+    # current resident set size; ru_maxrss would only ever grow while seeding
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return float("nan")
+
+
+class Command(BaseCommand):
+    help = "Benchmark memory use of the streaming order export on a throwaway database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000",
+                            help="Comma separated order counts, e.g. 10000,100000,1000000,5000000")
+        parser.add_argument("--output", default="csv", choices=["csv", "ndjson"])
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(n) for n in options["sizes"].split(","))
+
+        old_name = connection.settings_dict["NAME"]
+        if connection.vendor == "sqlite":
+            # millions of rows don't belong in :memory:
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            admin, variant = self.seed_catalog()
+            self.stdout.write("orders | seconds | rows/s | MB streamed | peak py alloc MB | RSS before | RSS after")
+            seeded = 0
+            for size in sizes:
+                self.seed_orders(admin, variant, seeded, size, options["batch_size"])
+                seeded = size
+                self.bench(admin, size, options["output"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed_catalog(self):
+        admin = User.objects.create(email="bench-admin@example.com", role="admin")
+        owner = User.objects.create(email="bench-vendor@example.com", role="vendor")
+        vendor = VendorProfile.objects.create(user=owner, business_name="Bench", address="-")
+        service = Service.objects.create(vendor=vendor, name="Bench service", description="-")
+        variant = ServiceVariant.objects.create(
+            service=service, name="Bench variant", price=Decimal("10.00"), estimated_minutes=30, stock=0
+        )
+        return admin, variant
+
+    def seed_orders(self, customer, variant, start, end, batch_size):
+        created = timezone.now() - timedelta(days=365)
+        for offset in range(start, end, batch_size):
+            RepairOrder.objects.bulk_create([
+                RepairOrder(
+                    customer=customer, vendor_id=variant.service.vendor_id, variant=variant,
+                    total_amount=Decimal("10.00"), status="paid",
+                )
+                for _ in range(min(batch_size, end - offset))
+            ])
+        RepairOrder.objects.update(created_at=created)
+
+    def bench(self, admin, size, output):
+        request = APIRequestFactory().get("/api/v1/repair-orders/export/", {"output": output})
+        force_authenticate(request, user=admin)
+        view = RepairOrderViewSet.as_view({"get": "export"})
+
+        rss_before = _rss_mb()
+        tracemalloc.start()
+        started = time.perf_counter()
+
+        response = view(request)
+        streamed = sum(len(chunk) for chunk in response.streaming_content)
+
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        rss_after = _rss_mb()
+
+        self.stdout.write(
+            f"{size:>6} | {elapsed:>7.1f} | {size / elapsed:>6.0f} | {streamed / 2**20:>11.1f} "
+            f"| {peak:>16.2f} | {rss_before:>10.1f} | {rss_after:>9.1f}"
+        )
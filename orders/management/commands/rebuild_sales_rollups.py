@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from orders.models import VendorDailySales
+from orders.rollups import rebuild_rollups
+from vendors.models import VendorProfile
+
+
+class Command(BaseCommand):
+    help = "Rebuild the vendor daily sales rollups from RepairOrder, a chunk of vendors at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=100)
+        parser.add_argument("--vendor", type=int, action="append", help="Only rebuild these vendor ids.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        vendors = VendorProfile.objects.all()
+        if options["vendor"]:
+            vendors = vendors.filter(pk__in=options["vendor"])
+
+        last_pk = 0
+        written = 0
+        while True:
+            ids = list(
+                vendors.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            written += rebuild_rollups(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f"Rebuilt up to vendor {last_pk}: {written} rows")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sales rollups rebuilt: {written} of {VendorDailySales.objects.count()} rows"
+        ))
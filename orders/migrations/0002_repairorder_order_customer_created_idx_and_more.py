@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        ('services', '0003_servicelisting'),
+        ('vendors', '0002_vendorprofile_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repairorder',
+            index=models.Index(fields=['customer', '-created_at'], name='order_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repairorder',
+            index=models.Index(fields=['vendor', '-created_at'], name='order_vendor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repairorder',
+            index=models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repairorder',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+    ]
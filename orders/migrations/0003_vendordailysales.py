@@ -0,0 +1,60 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill(apps, schema_editor):
+    RepairOrder = apps.get_model("orders", "RepairOrder")
+    VendorDailySales = apps.get_model("orders", "VendorDailySales")
+    rows = (
+        RepairOrder.objects.annotate(day=TruncDate("created_at"))
+        .values("vendor_id", "variant_id", "status", "day")
+        .annotate(order_count=Count("pk"), revenue=Sum("total_amount"))
+        .order_by()
+    )
+    VendorDailySales.objects.bulk_create(
+        [
+            VendorDailySales(
+                vendor_id=row["vendor_id"],
+                variant_id=row["variant_id"],
+                status=row["status"],
+                date=row["day"],
+                order_count=row["order_count"],
+                revenue=row["revenue"],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_repairorder_order_customer_created_idx_and_more'),
+        ('services', '0003_servicelisting'),
+        ('vendors', '0002_vendorprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('date', models.DateField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='services.servicevariant')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='vendors.vendorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', 'date'], name='daily_sales_vendor_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'variant', 'status', 'date'), name='unique_vendor_daily_sales')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
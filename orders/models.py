@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import User
 from vendors.models import VendorProfile
 from services.models import ServiceVariant
@@ -24,5 +24,60 @@ class RepairOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # every order listing filters on one of these and sorts newest first
+        indexes = [
+            models.Index(fields=["customer", "-created_at"], name="order_customer_created_idx"),
+            models.Index(fields=["vendor", "-created_at"], name="order_vendor_created_idx"),
+            models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+            models.Index(fields=["-created_at"], name="order_created_idx"),
+        ]
 
+    def save(self, *args, **kwargs):
+        # the post_save receivers write the sales rollups and the outbox
+        # events, which have to commit (or roll back) together with the order
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            return super().delete(*args, **kwargs)
+
+    ROLLUP_FIELDS = ("vendor_id", "variant_id", "status", "total_amount")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # how the sales rollups currently count this order, see orders.rollups.
+        # Read from __dict__: touching a deferred field would load it, which
+        # comes back through from_db. Partly loaded orders get no snapshot.
+        if all(name in order.__dict__ for name in cls.ROLLUP_FIELDS):
+            order._counted_as = tuple(order.__dict__[name] for name in cls.ROLLUP_FIELDS)
+        return order
+
+    def rollup_state(self):
+        return tuple(getattr(self, name) for name in self.ROLLUP_FIELDS)
+
+
+class VendorDailySales(models.Model):
+    """Orders and revenue per vendor, variant, status and day, kept up to date by orders.rollups."""
+
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name="daily_sales")
+    variant = models.ForeignKey(ServiceVariant, on_delete=models.CASCADE, related_name="daily_sales")
+    status = models.CharField(max_length=20, choices=RepairOrder.STATUS_CHOICES)
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vendor", "variant", "status", "date"], name="unique_vendor_daily_sales"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["vendor", "date"], name="daily_sales_vendor_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} / {self.variant_id} / {self.status} on {self.date}"
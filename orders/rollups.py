@@ -0,0 +1,154 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import RepairOrder, VendorDailySales
+
+# statuses whose orders count as revenue on the dashboard
+REVENUE_STATUSES = ("paid", "processing", "completed")
+
+
+def apply_deltas(deltas):
+    """
+    Add {(vendor_id, variant_id, status, date): (order_count, revenue)} to the
+    rollups in one INSERT ... ON CONFLICT on the unique key. Negative deltas
+    take orders away.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+
+    opts = VendorDailySales._meta
+    table = connection.ops.quote_name(opts.db_table)
+    columns = ["vendor", "variant", "status", "date", "order_count", "revenue"]
+    fields = [opts.get_field(name) for name in columns]
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(field.column for field in fields)}) "
+        f"VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(deltas))} "
+        f"ON CONFLICT (vendor_id, variant_id, status, date) DO UPDATE SET "
+        f"order_count = {table}.order_count + excluded.order_count, "
+        f"revenue = {table}.revenue + excluded.revenue"
+    )
+    params = [
+        field.get_db_prep_value(value, connection)
+        for key, delta in deltas.items()
+        for field, value in zip(fields, (*key, *delta))
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _add(deltas, order, state, sign):
+    vendor_id, variant_id, status, amount = state
+    key = (vendor_id, variant_id, status, timezone.localdate(order.created_at))
+    count, revenue = deltas[key]
+    deltas[key] = (count + sign, revenue + sign * Decimal(amount))
+
+
+def _new_deltas():
+    return defaultdict(lambda: (0, Decimal("0")))
+
+
+def record_orders(orders):
+    """Count freshly created orders, e.g. after a bulk_create."""
+    deltas = _new_deltas()
+    for order in orders:
+        _add(deltas, order, order.rollup_state(), 1)
+        order._counted_as = order.rollup_state()
+    apply_deltas(deltas)
+
+
+def forget_orders(orders):
+    """Take deleted orders back out of the rollups."""
+    deltas = _new_deltas()
+    for order in orders:
+        _add(deltas, order, getattr(order, "_counted_as", order.rollup_state()), -1)
+    apply_deltas(deltas)
+
+
+def record_changes(orders):
+    """
+    Move saved orders from the state they were counted in to their current
+    one. Orders that were never loaded from the database, or were loaded
+    with rollup fields deferred, are skipped, since there is nothing to move
+    them from.
+    """
+    deltas = _new_deltas()
+    for order in orders:
+        previous = getattr(order, "_counted_as", None)
+        current = order.rollup_state()
+        if previous is None or previous == current:
+            continue
+        _add(deltas, order, previous, -1)
+        _add(deltas, order, current, 1)
+        order._counted_as = current
+    apply_deltas(deltas)
+
+
+def record_status_change(orders, old_status):
+    """For set-based status updates, where every order moved from ``old_status``."""
+    deltas = _new_deltas()
+    for order in orders:
+        vendor_id, variant_id, _, amount = order.rollup_state()
+        _add(deltas, order, (vendor_id, variant_id, old_status, amount), -1)
+        _add(deltas, order, order.rollup_state(), 1)
+        order._counted_as = order.rollup_state()
+    apply_deltas(deltas)
+
+
+def rebuild_rollups(vendor_ids):
+    """Recompute the rollups of the given vendors from their orders. Returns the number of rows written."""
+    vendor_ids = list(vendor_ids)
+    rows = (
+        RepairOrder.objects.filter(vendor_id__in=vendor_ids)
+        .annotate(day=TruncDate("created_at"))
+        .values("vendor_id", "variant_id", "status", "day")
+        .annotate(order_count=Count("pk"), revenue=Sum("total_amount"))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        VendorDailySales.objects.filter(vendor_id__in=vendor_ids).delete()
+        created = VendorDailySales.objects.bulk_create([
+            VendorDailySales(
+                vendor_id=row["vendor_id"],
+                variant_id=row["variant_id"],
+                status=row["status"],
+                date=row["day"],
+                order_count=row["order_count"],
+                revenue=row["revenue"],
+            )
+            for row in rows
+        ])
+    return len(created)
+
+
+def sales_dashboard(vendor_id, start, end):
+    """Orders per status, revenue per day and revenue per service between two dates, from the rollups only."""
+    rollups = VendorDailySales.objects.filter(vendor_id=vendor_id, date__range=(start, end))
+    revenue = rollups.filter(status__in=REVENUE_STATUSES)
+
+    return {
+        "by_status": list(
+            rollups.values("status")
+            .annotate(orders=Sum("order_count"), revenue=Sum("revenue"))
+            .filter(orders__gt=0)
+            .order_by("status")
+        ),
+        "by_day": list(
+            revenue.values("date")
+            .annotate(orders=Sum("order_count"), revenue=Sum("revenue"))
+            .filter(orders__gt=0)
+            .order_by("date")
+        ),
+        "by_service": list(
+            revenue.values(service=F("variant__service_id"), service_name=F("variant__service__name"))
+            .annotate(orders=Sum("order_count"), revenue=Sum("revenue"))
+            .filter(orders__gt=0)
+            .order_by("-revenue")
+        ),
+    }
@@ -1,11 +1,25 @@
 from rest_framework import serializers
 from .models import RepairOrder
-from services.models import ServiceVariant
+from .transitions import can_transition
+from services.cache import get_variants
+from services.serializers import CachedVariantField
+
+
+def variant_problem(variant):
+    """Why an order can't be placed for ``variant`` (service and vendor loaded), or None."""
+    if not variant.service.is_active:
+        return "The selected service is not active."
+    if not variant.service.vendor.is_active:
+        return "The vendor for this service is not active."
+    return None
+
 
 class RepairOrderSerializer(serializers.ModelSerializer):
     customer_email = serializers.ReadOnlyField(source="customer.email")
     vendor_name = serializers.ReadOnlyField(source="vendor.business_name")
     variant_name = serializers.ReadOnlyField(source="variant.name")
+    # service and vendor come with the variant, validation and perform_create need both
+    variant = CachedVariantField()
 
     class Meta:
         model = RepairOrder
@@ -23,11 +37,56 @@ class RepairOrderSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "order_id", "customer", "vendor", "total_amount", "created_at", "updated_at"]
+        # status only changes through the transition endpoints
+        read_only_fields = [
+            "id", "order_id", "customer", "vendor", "status", "total_amount", "created_at", "updated_at"
+        ]
 
     def validate_variant(self, value):
-        if not value.service.is_active:
-            raise serializers.ValidationError("The selected service is not active.")
-        if not value.service.vendor.is_active:
-            raise serializers.ValidationError("The vendor for this service is not active.")
+        problem = variant_problem(value)
+        if problem:
+            raise serializers.ValidationError(problem)
         return value
+
+
+class RepairOrderLineSerializer(serializers.Serializer):
+    variant = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class RepairOrderBulkCreateSerializer(serializers.Serializer):
+    lines = RepairOrderLineSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_lines(self, lines):
+        # every variant with its service and vendor in one cache lookup
+        variants = get_variants({line["variant"] for line in lines})
+
+        errors, has_errors = [], False
+        for line in lines:
+            variant = variants.get(line["variant"])
+            problem = variant_problem(variant) if variant else "Invalid variant id."
+            errors.append({"variant": [problem]} if problem else {})
+            has_errors = has_errors or bool(problem)
+            line["variant"] = variant
+
+        if has_errors:
+            raise serializers.ValidationError(errors)
+        return lines
+
+
+class RepairOrderTransitionSerializer(serializers.Serializer):
+    from_status = serializers.ChoiceField(choices=RepairOrder.STATUS_CHOICES)
+    to_status = serializers.ChoiceField(choices=RepairOrder.STATUS_CHOICES)
+
+    def validate(self, attrs):
+        if not can_transition(attrs["from_status"], attrs["to_status"]):
+            raise serializers.ValidationError(
+                f"An order can't go from {attrs['from_status']} to {attrs['to_status']}."
+            )
+        return attrs
+
+
+class RepairOrderBulkTransitionSerializer(RepairOrderTransitionSerializer):
+    orders = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
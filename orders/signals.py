@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from common.outbox import emit
+from .events import created_events, status_changed_events
+from .models import RepairOrder
+from .rollups import forget_orders, record_changes, record_orders
+
+
+@receiver(post_save, sender=RepairOrder)
+def update_sales_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record_orders([instance])
+        emit(created_events([instance]))
+        return
+
+    # the status the order was loaded with, before record_changes moves it on
+    previous = getattr(instance, "_counted_as", None)
+    record_changes([instance])
+    if previous is not None and previous[2] != instance.status:
+        emit(status_changed_events([instance], previous[2]))
+
+
+@receiver(post_delete, sender=RepairOrder)
+def remove_from_sales_rollups(sender, instance, **kwargs):
+    forget_orders([instance])
@@ -1,3 +1,123 @@
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.db import connection
 from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from common.models import OutboxEvent
+from common.testing import create_variants, create_vendor
+from services.models import ServiceVariant
+from users.models import User
+from vendors.models import VendorProfile
+from .models import RepairOrder
+from .views import RepairOrderViewSet
 
-# Create your tests here.
+MILLION = 1_000_000
+
+
+@skipUnless(connection.vendor == "sqlite", "planner statistics are faked through sqlite_stat1")
+class RepairOrderListPlanTests(TestCase):
+    """
+    The listings must stay index range scans on a table of a million orders.
+    Rather than inserting a million rows, the planner is handed the
+    statistics of one through sqlite_stat1.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create(email="customer@example.com")
+        cls.admin = User.objects.create(email="admin@example.com", role="admin")
+        cls.vendor = create_vendor()
+        cls.vendor_user = cls.vendor.user
+        variant, = create_variants(vendor=cls.vendor)
+        RepairOrder.objects.bulk_create([
+            RepairOrder(customer=cls.customer, vendor=cls.vendor, variant=variant, total_amount=Decimal("10.00"))
+            for _ in range(20)
+        ])
+
+        cls.fake_statistics({
+            # a million orders: ~100 per customer, ~1000 per vendor, 6 statuses
+            RepairOrder._meta.db_table: (MILLION, {
+                "customer_id": "100", "vendor_id": "1000", "variant_id": "100",
+                "status": "166666", "created_at": "1", "order_id": "1",
+            }),
+            User._meta.db_table: (MILLION // 100, {}),
+            VendorProfile._meta.db_table: (MILLION // 1000, {}),
+            ServiceVariant._meta.db_table: (MILLION // 100, {}),
+        })
+
+    @classmethod
+    def fake_statistics(cls, tables):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            for table, (rows, selectivity) in tables.items():
+                cursor.execute("DELETE FROM sqlite_stat1 WHERE tbl = %s", [table])
+                cursor.execute("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (%s, NULL, %s)", [table, str(rows)])
+
+                cursor.execute(f"PRAGMA index_list({connection.ops.quote_name(table)})")
+                for index in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute(f"PRAGMA index_info({connection.ops.quote_name(index)})")
+                    columns = [row[2] for row in cursor.fetchall()]
+                    # rows per distinct value of each leading column prefix
+                    stat = [str(rows)] + [selectivity.get(column, "1") for column in columns]
+                    cursor.execute(
+                        "INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (%s, %s, %s)",
+                        [table, index, " ".join(stat)],
+                    )
+            cursor.execute("ANALYZE sqlite_schema")
+
+    def listing(self, user, query=""):
+        request = Request(APIRequestFactory().get(f"/api/v1/repair-orders/{query}"))
+        request.user = user
+        view = RepairOrderViewSet(action="list", request=request)
+        return view.get_queryset()
+
+    def assert_uses_index(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f"USING INDEX {index}", plan)
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+
+    def test_customer_listing(self):
+        self.assert_uses_index(self.listing(self.customer), "order_customer_created_idx")
+
+    def test_vendor_listing(self):
+        self.assert_uses_index(self.listing(self.vendor_user), "order_vendor_created_idx")
+
+    def test_admin_listing_by_status(self):
+        self.assert_uses_index(self.listing(self.admin, "?status=paid"), "order_status_created_idx")
+
+    def test_admin_listing(self):
+        self.assert_uses_index(self.listing(self.admin), "order_created_idx")
+
+    def test_related_objects_are_joined(self):
+        with self.assertNumQueries(1):
+            orders = list(self.listing(self.customer))
+            [(o.customer.email, o.vendor.business_name, o.variant.name) for o in orders]
+
+
+class RepairOrderOutboxTests(APITestCase):
+    def test_failing_outbox_write_rolls_the_order_back(self):
+        variant, = create_variants()
+        self.client.force_authenticate(User.objects.create(email="customer@example.com"))
+
+        with mock.patch("orders.signals.emit", side_effect=RuntimeError("outbox is down")):
+            with self.assertRaises(RuntimeError):
+                self.client.post("/api/v1/repair-orders/", {"variant": variant.pk}, format="json")
+
+        self.assertFalse(RepairOrder.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class RepairOrderLoadingTests(TestCase):
+    def test_orders_load_with_rollup_fields_deferred(self):
+        variant, = create_variants()
+        vendor = variant.service.vendor
+        RepairOrder.objects.create(
+            customer=User.objects.create(email="customer@example.com"),
+            vendor=vendor, variant=variant, total_amount=Decimal("10.00"),
+        )
+
+        order = RepairOrder.objects.only("id").get()
+        self.assertFalse(hasattr(order, "_counted_as"))
+        self.assertEqual(order.status, "pending")
+        self.assertEqual(RepairOrder.objects.get()._counted_as, (vendor.pk, variant.pk, "pending", Decimal("10.00")))
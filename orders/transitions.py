@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.utils import timezone
+from common.cache import bump_namespaces
+from common.outbox import emit
+from .events import status_changed_events
+from .rollups import record_status_change
+
+# status -> statuses an order may move to from there
+TRANSITIONS = {
+    "pending": {"paid", "failed", "cancelled"},
+    "paid": {"processing", "cancelled"},
+    "processing": {"completed", "failed"},
+    "completed": set(),
+    "failed": set(),
+    "cancelled": set(),
+}
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def transition(orders, from_status, to_status):
+    """
+    Move every order of the ``orders`` queryset that is still in ``from_status``
+    to ``to_status`` with one conditional UPDATE, without reading them first.
+    An order whose status changed in the meantime is simply not matched.
+
+    The UPDATE stamps updated_at with a known value, which is how the moved
+    orders are found again to adjust the sales rollups and write their
+    outbox events. Returns their ids.
+    """
+    if not can_transition(from_status, to_status):
+        raise ValueError(f"An order can't go from {from_status} to {to_status}.")
+
+    stamp = timezone.now()
+    with transaction.atomic():
+        updated = orders.filter(status=from_status).update(status=to_status, updated_at=stamp)
+        if not updated:
+            return []
+
+        moved = list(
+            orders.filter(status=to_status, updated_at=stamp)
+            .select_related(None)
+            .only(
+                "order_id", "customer_id", "vendor_id", "variant_id", "status",
+                "total_amount", "created_at",
+            )
+        )
+        record_status_change(moved, from_status)
+        emit(status_changed_events(moved, from_status))
+        transaction.on_commit(lambda: bump_namespaces(f"order:{order.pk}" for order in moved))
+
+    return [order.pk for order in moved]
@@ -1,26 +1,64 @@
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
+from rest_framework.response import Response
+from common.cache import CachedResponseMixin
+from users.authentication import ClaimsJWTAuthentication
+from users.models import User
+from .exports import EXPORT_FORMATS, export_rows
 from .models import RepairOrder
-from .serializers import RepairOrderSerializer
+from common.outbox import emit
+from .events import created_events
+from .rollups import record_orders
+from .serializers import (
+    RepairOrderSerializer,
+    RepairOrderBulkCreateSerializer,
+    RepairOrderTransitionSerializer,
+    RepairOrderBulkTransitionSerializer,
+)
+from . import transitions
 
-class RepairOrderViewSet(ModelViewSet):
+# customers may only call their own orders off
+CUSTOMER_TRANSITIONS = {"cancelled"}
+
+
+class RepairOrderViewSet(CachedResponseMixin, ModelViewSet):
     serializer_class = RepairOrderSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    cache_name = "orders"
+    cached_actions = ("retrieve",)
+
+    def cache_namespaces(self):
+        return [f"order:{self.kwargs['pk']}"]
 
     def get_queryset(self):
         user = self.request.user
         if user.role == "customer":
             # Customers can see only their own orders
-            return RepairOrder.objects.filter(customer=user)
+            orders = RepairOrder.objects.filter(customer_id=user.id)
         elif user.role == "vendor":
             # Vendors can see only their orders
-            return RepairOrder.objects.filter(vendor__user=user)
+            orders = RepairOrder.objects.filter(vendor_id=user.vendor_profile_id)
         elif user.role == "admin":
-            return RepairOrder.objects.all()
+            orders = RepairOrder.objects.all()
         else:
             return RepairOrder.objects.none()
 
+        status_filter = self.request.query_params.get("status")
+        if status_filter:
+            orders = orders.filter(status=status_filter)
+
+        # the serializer reads customer.email, vendor.business_name and variant.name
+        return orders.select_related("customer", "vendor", "variant").order_by("-created_at")
+
     def perform_create(self, serializer):
         user = self.request.user
         if user.role != "customer":
@@ -34,4 +72,110 @@ class RepairOrderViewSet(ModelViewSet):
         # total_amount = variant price
         total_amount = variant.price
 
-        serializer.save(customer=user, vendor=vendor, total_amount=total_amount)
+        # the order and its outbox event commit together, see RepairOrder.save
+        serializer.save(customer_id=user.id, vendor=vendor, total_amount=total_amount)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Create one order per line, validated together and written with one bulk insert."""
+        user = request.user
+        if user.role != "customer":
+            raise PermissionDenied("Only customers can create repair orders.")
+
+        serializer = RepairOrderBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # request.user only carries token claims, the response needs the email
+        customer = User.objects.get(pk=user.id)
+
+        # atomic, as the backend may split a large insert into several statements
+        with transaction.atomic():
+            orders = RepairOrder.objects.bulk_create([
+                RepairOrder(
+                    customer=customer,
+                    vendor=line["variant"].service.vendor,
+                    variant=line["variant"],
+                    total_amount=line["variant"].price * line["quantity"],
+                )
+                for line in serializer.validated_data["lines"]
+            ])
+            # bulk_create skips post_save
+            record_orders(orders)
+            emit(created_events(orders))
+
+        return Response(RepairOrderSerializer(orders, many=True).data, status=status.HTTP_201_CREATED)
+
+    def _check_transition(self, data):
+        if self.request.user.role == "customer" and data["to_status"] not in CUSTOMER_TRANSITIONS:
+            raise PermissionDenied("Customers can only cancel orders.")
+
+    @action(detail=True, methods=["post"], url_path="transition")
+    def transition(self, request, pk=None):
+        """Move one order along the status table, only if it is still in from_status."""
+        serializer = RepairOrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        self._check_transition(data)
+
+        orders = self.get_queryset().filter(pk=pk)
+        if not transitions.transition(orders, data["from_status"], data["to_status"]):
+            order = orders.first()
+            if order is None:
+                raise NotFound()
+            return Response(
+                {"detail": f"Order is {order.status}, not {data['from_status']}.", "status": order.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(RepairOrderSerializer(orders.get()).data)
+
+    @action(detail=False, methods=["post"], url_path="bulk-transition")
+    def bulk_transition(self, request):
+        """Move many orders with one UPDATE; orders not in from_status (or not visible) are skipped."""
+        serializer = RepairOrderBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        self._check_transition(data)
+
+        requested = set(data["orders"])
+        moved = transitions.transition(
+            self.get_queryset().filter(pk__in=requested), data["from_status"], data["to_status"]
+        )
+
+        return Response({"updated": sorted(moved), "skipped": sorted(requested - set(moved))})
+
+    def _date_param(self, name):
+        value = self.request.query_params.get(name)
+        if value in (None, ""):
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: "Must be a date (YYYY-MM-DD)."})
+        # start of that day, so created_at can be compared with its index
+        return timezone.make_aware(datetime.combine(parsed, time.min))
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream the visible orders as CSV or NDJSON (?output=csv|ndjson), filtered
+        by ?status and the ?from/?to dates (inclusive). Memory use doesn't depend
+        on the number of orders exported.
+        """
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({"output": f"Must be one of {', '.join(EXPORT_FORMATS)}."})
+        lines, content_type, extension = EXPORT_FORMATS[output]
+
+        orders = self.get_queryset()
+        start = self._date_param("from")
+        end = self._date_param("to")
+        if start:
+            orders = orders.filter(created_at__gte=start)
+        if end:
+            orders = orders.filter(created_at__lt=end + timedelta(days=1))
+
+        response = StreamingHttpResponse(lines(export_rows(orders)), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="orders.{extension}"'
+        return response
@@ -0,0 +1,116 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from cart.models import CartItem
+from .models import StockReservation
+from .providers import PaymentError, ProviderUnavailable, get_payment_provider
+from .reservations import release_reservations, reserve_cart
+
+
+def _cache():
+    return caches[settings.CHECKOUT_CACHE_ALIAS]
+
+
+def _cache_key(user_id):
+    return f"checkout:{user_id}"
+
+
+def cart_hash(lines):
+    """Digest of (variant_id, quantity, price) lines; the same cart always hashes the same."""
+    content = json.dumps(
+        sorted([variant_id, qty, str(price)] for variant_id, qty, price in lines)
+        + [settings.PAYMENT_CURRENCY]
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def start_checkout(user):
+    """
+    Reserve the user's cart and start one payment for it.
+
+    The payment is created with the reservation's reference as idempotency
+    key, so a retried provider call never creates a second payment, and the
+    result is cached until the reservation expires or the payment succeeds or
+    fails. A retry of the same cart that finds it in the cache with its
+    reservation still held answers without calling the provider. Otherwise
+    the cart is reserved again and gets a new payment, and the cached one is
+    cancelled first.
+
+    Returns (checkout, created), or (None, False) for an empty cart. Raises
+    services.inventory.OutOfStock, or PaymentError when the provider fails,
+    in which case nothing stays reserved.
+    """
+    lines = list(
+        CartItem.objects.filter(cart__user_id=user.id)
+        .values_list("variant_id", "quantity", "variant__price")
+    )
+    if not lines:
+        return None, False
+
+    digest = cart_hash(lines)
+    amount = sum(price * qty for _, qty, price in lines)
+    cached = _cache().get(_cache_key(user.id))
+    # while the reservation is held the payment can't have gone through
+    if cached and cached["cart_hash"] == digest and StockReservation.objects.filter(
+        reference=cached["reservation"], status=StockReservation.HELD
+    ).exists():
+        return cached, False
+    if cached:
+        _cancel_superseded(cached)
+
+    reference, reservations = reserve_cart(user)
+    if reference is None:
+        return None, False
+
+    try:
+        payment = _create_payment(user, amount, digest, reference)
+    except PaymentError:
+        release_reservations(StockReservation.objects.filter(reference=reference))
+        raise
+
+    checkout = json.loads(json.dumps({
+        "cart_hash": digest,
+        "payment_id": payment.id,
+        "client_secret": payment.client_secret,
+        "amount": amount,
+        "currency": settings.PAYMENT_CURRENCY,
+        "reservation": reference,
+        "expires_at": reservations[0].expires_at,
+    }, cls=DjangoJSONEncoder))
+    _cache().set(_cache_key(user.id), checkout, settings.STOCK_RESERVATION_TTL)
+    return checkout, True
+
+
+def forget_checkout(user_id):
+    """Drop the user's cached checkout once its payment succeeded or failed."""
+    transaction.on_commit(lambda: _cache().delete(_cache_key(user_id)))
+
+
+def _cancel_superseded(checkout):
+    # "duplicate" tells the canceled webhook to leave the reservation alone:
+    # the new checkout takes it over
+    try:
+        get_payment_provider().cancel_payment(
+            checkout["payment_id"], f"cancel-{checkout['payment_id']}", reason="duplicate"
+        )
+    except ProviderUnavailable:
+        raise
+    except PaymentError:
+        # it already succeeded or was cancelled; fulfill_payment refuses it
+        # because it no longer matches the cart
+        pass
+
+
+def _create_payment(user, amount, digest, reference):
+    # providers replay the payment created first under a key, so every
+    # reservation gets its own: after a payment went through, was cancelled
+    # or its reservation expired, checking out again gets a new payment
+    return get_payment_provider().create_payment(
+        amount,
+        settings.PAYMENT_CURRENCY,
+        f"checkout-{user.id}-{reference}",
+        metadata={"user_id": str(user.id), "cart_hash": digest},
+    )
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from cart.backends import get_cart_backend
+from cart.models import CartItem
+from common.outbox import emit
+from orders.events import created_events
+from orders.models import RepairOrder
+from orders.rollups import record_orders
+from services.inventory import deduct_stock
+from .checkout import cart_hash, forget_checkout
+from .models import StockReservation, StripeEvent
+from .providers import to_minor_units
+from .reservations import consume_reservations, release_reservations
+
+
+def payment_event(type, intent, payload):
+    return (type, intent.get("id", ""), {
+        "payment_intent": intent.get("id"),
+        "user_id": intent["metadata"]["user_id"],
+        **payload,
+    })
+
+
+def fulfill_payment(intent):
+    """
+    Turn the paying user's cart into paid RepairOrders.
+
+    The intent must have been created for the cart as it is now, by its
+    metadata.cart_hash and its amount. Otherwise, e.g. for a superseded
+    payment confirmed in another tab or a second payment after the cart was
+    already turned into orders, nothing is created and a
+    payment.refund_required event is emitted instead.
+
+    Runs a fixed number of queries whatever the cart size: one read of the
+    cart lines with their variant, service and vendor, one bulk insert, one
+    sales rollup upsert, one outbox insert, one stock UPDATE and one delete.
+    """
+    user_id = intent["metadata"]["user_id"]
+    items = list(
+        CartItem.objects.filter(cart__user_id=user_id)
+        .select_related("variant__service__vendor")
+    )
+    amount = sum(item.variant.price * item.quantity for item in items)
+    digest = cart_hash((item.variant_id, item.quantity, item.variant.price) for item in items)
+    if (
+        not items
+        or intent["metadata"].get("cart_hash") != digest
+        or intent.get("amount") != to_minor_units(amount)
+    ):
+        emit([payment_event("payment.refund_required", intent, {
+            "amount": Decimal(intent.get("amount") or 0) / 100,
+            "cart_hash": intent["metadata"].get("cart_hash"),
+        })])
+        return []
+
+    with transaction.atomic():
+        reserved = consume_reservations(user_id)
+        orders = RepairOrder.objects.bulk_create([
+            RepairOrder(
+                customer_id=user_id,
+                vendor=item.variant.service.vendor,
+                variant=item.variant,
+                total_amount=item.variant.price * item.quantity,
+                status="paid",
+            )
+            for item in items
+        ])
+        record_orders(orders)
+        emit(created_events(orders) + [payment_event("payment.succeeded", intent, {
+            "orders": [order.order_id for order in orders],
+            "amount": sum(order.total_amount for order in orders),
+        })])
+
+        # stock is already taken unless the reservation expired first
+        shortfall = defaultdict(int)
+        for item in items:
+            covered = min(reserved.get(item.variant_id, 0), item.quantity)
+            reserved[item.variant_id] = reserved.get(item.variant_id, 0) - covered
+            if item.quantity > covered:
+                shortfall[item.variant_id] += item.quantity - covered
+        deduct_stock(shortfall)
+
+        CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+
+        variant_ids = [item.variant_id for item in items]
+        transaction.on_commit(lambda: get_cart_backend().checked_out(user_id, variant_ids))
+        forget_checkout(user_id)
+
+    return orders
+
+
+def cancel_payment(intent):
+    if intent.get("cancellation_reason") == "duplicate":
+        # superseded by a newer checkout, which took over its reservation
+        return
+
+    with transaction.atomic():
+        released = release_reservations(
+            StockReservation.objects.filter(user_id=intent["metadata"]["user_id"])
+        )
+        emit([payment_event("payment.failed", intent, {
+            "status": intent.get("status"),
+            "released_reservations": released,
+        })])
+        forget_checkout(intent["metadata"]["user_id"])
+
+
+EVENT_HANDLERS = {
+    "payment_intent.succeeded": fulfill_payment,
+    "payment_intent.payment_failed": cancel_payment,
+    "payment_intent.canceled": cancel_payment,
+}
+
+
+def process_event(event_id):
+    """
+    Run the handler for a stored Stripe event exactly once.
+
+    The event is claimed with a conditional update first, so a duplicate
+    delivery (or a second worker picking up the same id) is dropped. Returns
+    False when the event was already claimed.
+    """
+    claimed = StripeEvent.objects.filter(
+        event_id=event_id, status=StripeEvent.RECEIVED
+    ).update(status=StripeEvent.PROCESSING, updated_at=timezone.now())
+    if not claimed:
+        return False
+
+    event = StripeEvent.objects.get(event_id=event_id)
+    handler = EVENT_HANDLERS.get(event.type)
+
+    try:
+        with transaction.atomic():
+            if handler:
+                handler(event.payload["data"]["object"])
+            now = timezone.now()
+            StripeEvent.objects.filter(pk=event.pk).update(
+                status=StripeEvent.PROCESSED, error="", processed_at=now, updated_at=now
+            )
+    except Exception as exc:
+        StripeEvent.objects.filter(pk=event.pk).update(
+            status=StripeEvent.FAILED, error=str(exc), updated_at=timezone.now()
+        )
+        raise
+
+    return True
@@ -0,0 +1,125 @@
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, OperationalError
+from django.test.utils import CaptureQueriesContext
+from cart.models import Cart, CartItem
+from services.inventory import OutOfStock
+from services.models import Service, ServiceVariant
+from users.models import User
+from vendors.models import VendorProfile
+from payment.models import StockReservation
+from payment.reservations import reserve_cart, release_reservations
+
+
+def _ms(samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    return statistics.median(samples) * 1000, p95 * 1000
+
+
+class Command(BaseCommand):
+    help = "Benchmark checkout stock reservation latency on a throwaway database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cart-sizes", default="1,10,50,200")
+        parser.add_argument("--buyers", default="1,4,16,32")
+        parser.add_argument("--rounds", type=int, default=20)
+
+    def handle(self, *args, **options):
+        cart_sizes = [int(n) for n in options["cart_sizes"].split(",")]
+        buyers = [int(n) for n in options["buyers"].split(",")]
+        rounds = options["rounds"]
+
+        old_name = connection.settings_dict["NAME"]
+        if connection.vendor == "sqlite":
+            # a file (not :memory:) so concurrent buyers get their own connections
+            tmp_dir = tempfile.mkdtemp()
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp_dir, "bench.sqlite3")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            variants = self.seed_catalog(max(cart_sizes))
+            self.bench_cart_size(variants, cart_sizes, rounds)
+            self.bench_concurrency(variants, buyers, rounds)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed_catalog(self, size):
+        owner = User.objects.create(email="bench-vendor@example.com", role="vendor")
+        vendor = VendorProfile.objects.create(user=owner, business_name="Bench", address="-")
+        service = Service.objects.create(vendor=vendor, name="Bench service", description="-")
+        return ServiceVariant.objects.bulk_create([
+            ServiceVariant(
+                service=service, name=f"Variant {i}", price=Decimal("10.00"),
+                estimated_minutes=30, stock=1_000_000,
+            )
+            for i in range(size)
+        ])
+
+    def make_buyers(self, count, variants, prefix):
+        users = User.objects.bulk_create([
+            User(email=f"{prefix}-{i}@example.com", role="customer") for i in range(count)
+        ])
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, variant=variant, quantity=1)
+            for cart in carts
+            for variant in variants
+        ])
+        return users
+
+    def bench_cart_size(self, variants, cart_sizes, rounds):
+        self.stdout.write("cart lines | queries | p50 ms | p95 ms")
+        for size in cart_sizes:
+            user = self.make_buyers(1, variants[:size], f"size-{size}")[0]
+            samples = []
+            for _ in range(rounds):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    reserve_cart(user)
+                    samples.append(time.perf_counter() - started)
+            release_reservations(StockReservation.objects.filter(user=user))
+
+            p50, p95 = _ms(samples)
+            self.stdout.write(f"{size:>10} | {len(queries):>7} | {p50:>6.2f} | {p95:>6.2f}")
+
+    def bench_concurrency(self, variants, buyer_counts, rounds):
+        # every buyer wants the same hot variant plus a couple of others
+        hot_cart = variants[:3]
+        self.stdout.write("")
+        self.stdout.write("buyers | checkouts/s | p50 ms | p95 ms | sold out | lock errors")
+        for count in buyer_counts:
+            users = self.make_buyers(count, hot_cart, f"concurrent-{count}")
+            errors = {"sold_out": 0, "locked": 0}
+
+            def buyer(user):
+                samples = []
+                try:
+                    for _ in range(rounds):
+                        started = time.perf_counter()
+                        try:
+                            reserve_cart(user)
+                        except OutOfStock:
+                            errors["sold_out"] += 1
+                        except OperationalError:
+                            errors["locked"] += 1
+                        samples.append(time.perf_counter() - started)
+                finally:
+                    connections.close_all()
+                return samples
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=count) as pool:
+                samples = [s for batch in pool.map(buyer, users) for s in batch]
+            elapsed = time.perf_counter() - started
+
+            p50, p95 = _ms(samples)
+            self.stdout.write(
+                f"{count:>6} | {len(samples) / elapsed:>11.1f} | {p50:>6.2f} | {p95:>6.2f} "
+                f"| {errors['sold_out']:>8} | {errors['locked']:>11}"
+            )
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from payment.fulfillment import process_event
+from payment.models import StripeEvent
+from payment.tasks import process_stripe_event
+
+
+class Command(BaseCommand):
+    help = "Replay stored Stripe webhook events, either through Celery or inline."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status", action="append", choices=[StripeEvent.FAILED, StripeEvent.RECEIVED],
+            help="Status to replay (repeatable). Defaults to failed events.",
+        )
+        parser.add_argument(
+            "--stuck-minutes", type=int,
+            help="Also replay events a worker claimed more than this many minutes ago "
+                 "and never finished, e.g. because it died",
+        )
+        parser.add_argument("--type", help="Only replay events of this type")
+        parser.add_argument("--since", help="Only replay events received after this ISO datetime")
+        parser.add_argument("--event-id", action="append", dest="event_ids")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--sync", action="store_true", help="Process in this process instead of queueing")
+
+    def handle(self, *args, **options):
+        replayable = Q(status__in=options["status"] or [StripeEvent.FAILED])
+        if options["stuck_minutes"] is not None:
+            if options["stuck_minutes"] < 1:
+                raise CommandError("--stuck-minutes must be at least 1")
+            # an event still being processed must not be claimed a second time
+            replayable |= Q(
+                status=StripeEvent.PROCESSING,
+                updated_at__lt=timezone.now() - timedelta(minutes=options["stuck_minutes"]),
+            )
+
+        events = StripeEvent.objects.filter(replayable)
+        if options["type"]:
+            events = events.filter(type=options["type"])
+        if options["since"]:
+            events = events.filter(received_at__gte=parse_datetime(options["since"]))
+        if options["event_ids"]:
+            events = events.filter(event_id__in=options["event_ids"])
+
+        event_ids = list(events.order_by("received_at").values_list("event_id", flat=True))
+        batch_size = options["batch_size"]
+        replayed = 0
+
+        for start in range(0, len(event_ids), batch_size):
+            batch = event_ids[start:start + batch_size]
+            # reset in one statement, skipping events that moved on since they
+            # were listed; process_event claims each id again
+            events.filter(event_id__in=batch).update(
+                status=StripeEvent.RECEIVED, error="", updated_at=timezone.now()
+            )
+
+            for event_id in batch:
+                if options["sync"]:
+                    try:
+                        process_event(event_id)
+                    except Exception as exc:
+                        self.stderr.write(f"{event_id}: {exc}")
+                        continue
+                else:
+                    process_stripe_event.delay(event_id)
+                replayed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} of {len(event_ids)} events"))
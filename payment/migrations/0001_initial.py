@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('held', 'Held'), ('consumed', 'Consumed'), ('released', 'Released')], default='held', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to=settings.AUTH_USER_MODEL)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.servicevariant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='payment_sto_status_acd41e_idx'), models.Index(fields=['user', 'status'], name='payment_sto_user_id_7af45a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_stripeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeevent',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
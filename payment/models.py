@@ -1,3 +1,64 @@
+import uuid
 from django.db import models
+from users.models import User
+from services.models import ServiceVariant
 
-# Create your models here.
+
+class StockReservation(models.Model):
+    HELD = "held"
+    CONSUMED = "consumed"
+    RELEASED = "released"
+    STATUS_CHOICES = (
+        (HELD, "Held"),
+        (CONSUMED, "Consumed"),
+        (RELEASED, "Released"),
+    )
+
+    # all lines reserved by one checkout share the same reference
+    reference = models.UUIDField(default=uuid.uuid4, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reservations")
+    variant = models.ForeignKey(ServiceVariant, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "expires_at"]),
+            models.Index(fields=["user", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} × variant {self.variant_id} ({self.status})"
+
+
+class StripeEvent(models.Model):
+    RECEIVED = "received"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (RECEIVED, "Received"),
+        (PROCESSING, "Processing"),
+        (PROCESSED, "Processed"),
+        (FAILED, "Failed"),
+    )
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=RECEIVED)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    # set by every status change, which all go through update()
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "received_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id})"
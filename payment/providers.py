@@ -0,0 +1,315 @@
+"""
+Payment providers behind one interface.
+
+Every provider keeps one pooled HTTP session per process, bounds each call
+with settings.PAYMENT_HTTP_TIMEOUT, retries transient failures with the same
+idempotency key, and stops calling a provider that keeps failing until its
+circuit breaker lets a trial call through again.
+"""
+import os
+import threading
+import time
+import uuid
+from decimal import Decimal
+import paypalrestsdk
+import requests
+import stripe
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+
+class PaymentError(Exception):
+    """The provider refused the request or could not be reached."""
+
+
+class ProviderUnavailable(PaymentError):
+    """The provider is failing; the call was not (or no longer) attempted."""
+
+
+class TransientError(Exception):
+    """A failure worth retrying: timeouts, dropped connections, 429s and 5xx."""
+
+
+class Payment:
+    """A payment as the provider reports it."""
+
+    def __init__(self, id, status, amount, currency, client_secret="", approval_url=""):
+        self.id = id
+        self.status = status
+        self.amount = amount
+        self.currency = currency
+        self.client_secret = client_secret  # Stripe: confirms the payment in the browser
+        self.approval_url = approval_url  # PayPal: where the buyer approves it
+
+
+class CircuitBreaker:
+    """
+    Opens after ``threshold`` calls in a row failed transiently. While open,
+    calls fail straight away; after ``reset_after`` seconds one trial call is
+    let through, which closes the breaker again if it succeeds.
+    """
+
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                # half open: this caller is the trial, the rest keep failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def pooled_session():
+    session = requests.Session()
+    # retries are done by PaymentProvider.call, with the idempotency key
+    adapter = HTTPAdapter(pool_maxsize=settings.PAYMENT_HTTP_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def to_minor_units(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal("1")))
+
+
+class PaymentProvider:
+    """
+    create_payment() starts a payment for ``amount`` and returns a Payment;
+    cancel_payment() gives up on one that was never completed. Calls with the
+    same idempotency key return the same payment.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            settings.PAYMENT_BREAKER_THRESHOLD, settings.PAYMENT_BREAKER_RESET_SECONDS
+        )
+
+    def create_payment(self, amount, currency, idempotency_key, metadata=None, lines=(),
+                       return_url=None, cancel_url=None):
+        raise NotImplementedError
+
+    def cancel_payment(self, payment_id, idempotency_key, reason=None):
+        raise NotImplementedError
+
+    def call(self, request):
+        """Run ``request`` under the breaker, retrying transient failures with a backoff."""
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} is unavailable, try again shortly")
+
+        for attempt in range(settings.PAYMENT_RETRIES + 1):
+            try:
+                result = request()
+            except TransientError as exc:
+                if attempt == settings.PAYMENT_RETRIES:
+                    self.breaker.failed()
+                    raise ProviderUnavailable(f"{self.name} is unavailable: {exc}") from exc
+                time.sleep(settings.PAYMENT_RETRY_BACKOFF * 2 ** attempt)
+            else:
+                self.breaker.succeeded()
+                return result
+
+
+class StripeProvider(PaymentProvider):
+    name = "Stripe"
+
+    def __init__(self):
+        super().__init__()
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY or "",
+            http_client=stripe.RequestsClient(
+                timeout=settings.PAYMENT_HTTP_TIMEOUT, session=pooled_session()
+            ),
+            max_network_retries=0,
+        )
+
+    def _request(self, send):
+        def request():
+            try:
+                return send()
+            except (stripe.APIConnectionError, stripe.RateLimitError) as exc:
+                raise TransientError(str(exc)) from exc
+            except stripe.APIError as exc:
+                if (exc.http_status or 500) >= 500:
+                    raise TransientError(str(exc)) from exc
+                raise PaymentError(exc.user_message or str(exc)) from exc
+            except stripe.StripeError as exc:
+                raise PaymentError(exc.user_message or str(exc)) from exc
+        return self.call(request)
+
+    def _payment(self, intent):
+        return Payment(
+            id=intent.id,
+            status=intent.status,
+            amount=Decimal(intent.amount) / 100,
+            currency=intent.currency,
+            client_secret=intent.client_secret or "",
+        )
+
+    def create_payment(self, amount, currency, idempotency_key, metadata=None, lines=(),
+                       return_url=None, cancel_url=None):
+        intent = self._request(lambda: self.client.v1.payment_intents.create(
+            params={
+                "amount": to_minor_units(amount),
+                "currency": currency,
+                "metadata": metadata or {},
+                "automatic_payment_methods": {"enabled": True},
+            },
+            options={"idempotency_key": idempotency_key},
+        ))
+        return self._payment(intent)
+
+    def cancel_payment(self, payment_id, idempotency_key, reason=None):
+        intent = self._request(lambda: self.client.v1.payment_intents.cancel(
+            payment_id,
+            params={"cancellation_reason": reason} if reason else {},
+            options={"idempotency_key": idempotency_key},
+        ))
+        return self._payment(intent)
+
+
+class PooledPayPalApi(paypalrestsdk.Api):
+    """The SDK's Api, sending through a pooled session with timeouts instead of requests.request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = pooled_session()
+
+    def http_call(self, url, method, **kwargs):
+        try:
+            response = self.session.request(
+                method, url, proxies=self.proxies, timeout=settings.PAYMENT_HTTP_TIMEOUT, **kwargs
+            )
+        except requests.RequestException as exc:
+            raise TransientError(str(exc)) from exc
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientError(f"PayPal answered {response.status_code}")
+        return self.handle_response(response, response.content.decode("utf-8"))
+
+
+class PayPalProvider(PaymentProvider):
+    name = "PayPal"
+
+    def __init__(self):
+        super().__init__()
+        self.api = PooledPayPalApi(
+            mode=settings.PAYPAL_MODE,
+            client_id=settings.PAYPAL_CLIENT_ID or "",
+            client_secret=settings.PAYPAL_CLIENT_SECRET or "",
+        )
+
+    def create_payment(self, amount, currency, idempotency_key, metadata=None, lines=(),
+                       return_url=None, cancel_url=None):
+        payment = paypalrestsdk.Payment({
+            "intent": "sale",
+            "payer": {"payment_method": "paypal"},
+            "redirect_urls": {"return_url": return_url, "cancel_url": cancel_url},
+            "transactions": [{
+                "item_list": {"items": [
+                    {**line, "price": str(line["price"]), "currency": currency.upper()} for line in lines
+                ]},
+                "amount": {"total": str(amount), "currency": currency.upper()},
+                "description": "Service Booking Payment",
+                "custom": ",".join(f"{key}={value}" for key, value in (metadata or {}).items()),
+            }],
+        }, api=self.api)
+        # sent as PayPal-Request-Id, which makes a retried create return the same payment
+        payment.request_id = idempotency_key
+
+        def request():
+            try:
+                created = payment.create()
+            except paypalrestsdk.exceptions.ConnectionError as exc:
+                # 4xx answers other than 400, e.g. bad credentials or a
+                # rejected payment; 429 and 5xx arrive as TransientError
+                raise PaymentError(f"PayPal refused the payment: {exc}") from exc
+            if not created:
+                raise PaymentError(payment.error)
+            return payment
+
+        payment = self.call(request)
+        approval = next((link.href for link in payment.links if link.rel == "approval_url"), "")
+        return Payment(
+            id=payment.id, status=payment.state, amount=Decimal(amount), currency=currency,
+            approval_url=approval,
+        )
+
+    def cancel_payment(self, payment_id, idempotency_key, reason=None):
+        # a created PayPal payment that is never approved simply expires
+        return None
+
+
+class FakeProvider(PaymentProvider):
+    """
+    In-process stand-in that never leaves the machine, for load tests and
+    offline development. Honors idempotency keys like the real providers and
+    can be slowed down with settings.PAYMENT_FAKE_LATENCY.
+    """
+
+    name = "Fake"
+
+    def __init__(self):
+        super().__init__()
+        self.payments = {}
+        self._lock = threading.Lock()
+
+    def create_payment(self, amount, currency, idempotency_key, metadata=None, lines=(),
+                       return_url=None, cancel_url=None):
+        def request():
+            time.sleep(settings.PAYMENT_FAKE_LATENCY)
+            with self._lock:
+                if idempotency_key not in self.payments:
+                    payment_id = f"fake_{uuid.uuid4().hex}"
+                    self.payments[idempotency_key] = Payment(
+                        id=payment_id,
+                        status="requires_payment_method",
+                        amount=Decimal(amount),
+                        currency=currency,
+                        client_secret=f"{payment_id}_secret_{uuid.uuid4().hex}",
+                        approval_url=return_url or "",
+                    )
+                return self.payments[idempotency_key]
+        return self.call(request)
+
+    def cancel_payment(self, payment_id, idempotency_key, reason=None):
+        with self._lock:
+            for payment in self.payments.values():
+                if payment.id == payment_id:
+                    payment.status = "canceled"
+                    return payment
+        raise PaymentError(f"No such payment: {payment_id}")
+
+
+_providers = {}
+
+
+def get_payment_provider(path=None):
+    """
+    The provider at dotted ``path`` (settings.PAYMENT_PROVIDER by default),
+    built once per process so its connection pool and breaker are shared.
+    """
+    key = (path or settings.PAYMENT_PROVIDER, os.getpid())
+    if key not in _providers:
+        _providers[key] = import_string(key[0])()
+    return _providers[key]
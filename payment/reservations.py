@@ -0,0 +1,104 @@
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from cart.models import CartItem
+from services.inventory import give_back_stock, stock_atomic, take_stock
+from .models import StockReservation
+
+
+def _group(lines):
+    quantities = defaultdict(int)
+    for variant_id, qty in lines:
+        quantities[variant_id] += qty
+    return quantities
+
+
+def reserve_cart(user, ttl=None):
+    """
+    Reserve stock for every line of the user's cart in one step.
+
+    Any reservation the user still holds from an earlier checkout is replaced,
+    so retrying checkout never reserves the same cart twice: only what the
+    cart needs beyond it is taken, and what it no longer needs is given back.
+    Raises services.inventory.OutOfStock when a single line can't be covered;
+    in that case nothing changes.
+    """
+    lines = list(
+        CartItem.objects.filter(cart__user_id=user.id).values_list("variant_id", "quantity")
+    )
+    if not lines:
+        return None, []
+
+    ttl = ttl or settings.STOCK_RESERVATION_TTL
+    reference = uuid.uuid4()
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    quantities = _group(lines)
+
+    with stock_atomic():
+        held = _claim_held(StockReservation.objects.filter(user_id=user.id), StockReservation.RELEASED)
+        previous = _group((variant_id, qty) for _, variant_id, qty in held)
+        take_stock({
+            variant_id: qty - previous.get(variant_id, 0)
+            for variant_id, qty in quantities.items() if qty > previous.get(variant_id, 0)
+        })
+        give_back_stock({
+            variant_id: qty - quantities.get(variant_id, 0)
+            for variant_id, qty in previous.items() if qty > quantities.get(variant_id, 0)
+        })
+        reservations = StockReservation.objects.bulk_create([
+            StockReservation(
+                reference=reference,
+                user_id=user.id,
+                variant_id=variant_id,
+                quantity=qty,
+                expires_at=expires_at,
+            )
+            for variant_id, qty in quantities.items()
+        ])
+
+    return reference, reservations
+
+
+def release_reservations(queryset):
+    """Give the stock of held reservations in ``queryset`` back. Returns the number released."""
+    with transaction.atomic():
+        held = _claim_held(queryset, StockReservation.RELEASED)
+        give_back_stock(_group((variant_id, qty) for _, variant_id, qty in held))
+
+    return len(held)
+
+
+def _claim_held(queryset, status):
+    """Move the held reservations in ``queryset`` to ``status``; returns their (id, variant_id, quantity)."""
+    held = list(
+        queryset.filter(status=StockReservation.HELD)
+        .select_for_update()
+        .values_list("id", "variant_id", "quantity")
+    )
+    if held:
+        StockReservation.objects.filter(
+            pk__in=[row[0] for row in held], status=StockReservation.HELD
+        ).update(status=status)
+    return held
+
+
+def release_expired_reservations():
+    return release_reservations(
+        StockReservation.objects.filter(expires_at__lte=timezone.now())
+    )
+
+
+def consume_reservations(user):
+    """
+    Mark the user's held reservations as paid for.
+
+    Returns {variant_id: quantity} of the stock that was already taken, so the
+    caller only has to decrement what expired before the payment came in.
+    """
+    with transaction.atomic():
+        held = _claim_held(StockReservation.objects.filter(user=user), StockReservation.CONSUMED)
+
+    return _group((variant_id, qty) for _, variant_id, qty in held)
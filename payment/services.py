@@ -1,45 +1,32 @@
-import paypalrestsdk
+import uuid
 from decimal import Decimal
-from cart.models import Cart
-from orders.models import RepairOrder
 from django.conf import settings
+from cart.models import Cart
+from .providers import get_payment_provider
 
 
-def create_paypal_payment(cart: Cart, return_url, cancel_url):
+def create_paypal_payment(cart: Cart, return_url, cancel_url, idempotency_key=None):
     items = []
     total = Decimal("0.00")
 
-    for item in cart.items.all():
-        price = item.product.variant.price
+    for item in cart.items.select_related("variant"):
+        price = item.variant.price
         qty = item.quantity
         total += price * qty
 
         items.append({
-            "name": item.product.variant.name,
-            "sku": str(item.product.id),
-            "price": str(price),
-            "currency": "USD",
-            "quantity": qty
+            "name": item.variant.name,
+            "sku": str(item.variant_id),
+            "price": price,
+            "quantity": qty,
         })
 
-    payment = paypalrestsdk.Payment({
-        "intent": "sale",
-        "payer": {"payment_method": "paypal"},
-        "redirect_urls": {
-            "return_url": return_url,
-            "cancel_url": cancel_url
-        },
-        "transactions": [{
-            "item_list": {"items": items},
-            "amount": {
-                "total": str(total),
-                "currency": "USD"
-            },
-            "description": "Service Booking Payment"
-        }]
-    })
-
-    if payment.create():
-        return payment
-    else:
-        raise Exception(payment.error)
+    return get_payment_provider("payment.providers.PayPalProvider").create_payment(
+        total,
+        settings.PAYMENT_CURRENCY,
+        idempotency_key or str(uuid.uuid4()),
+        metadata={"cart": cart.id},
+        lines=items,
+        return_url=return_url,
+        cancel_url=cancel_url,
+    )
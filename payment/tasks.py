@@ -0,0 +1,13 @@
+from celery import shared_task
+from .fulfillment import process_event
+from .reservations import release_expired_reservations
+
+
+@shared_task
+def release_expired_reservations_task():
+    return release_expired_reservations()
+
+
+@shared_task
+def process_stripe_event(event_id):
+    return process_event(event_id)
@@ -1,3 +1,207 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
+import requests
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from cart.models import Cart, CartItem
+from common.models import OutboxEvent
+from common.testing import create_variants
+from orders.models import RepairOrder
+from services.inventory import OutOfStock
+from services.models import ServiceVariant
+from users.models import User
+from .checkout import cart_hash
+from .fulfillment import cancel_payment, fulfill_payment
+from .models import StockReservation
+from .providers import (
+    FakeProvider, PaymentError, PayPalProvider, PooledPayPalApi, ProviderUnavailable,
+    get_payment_provider, to_minor_units,
+)
+from .reservations import release_reservations, reserve_cart
 
-# Create your tests here.
+
+def paid_intent(user, payment_id=""):
+    """The succeeded intent Stripe would send for the user's cart as it is now."""
+    lines = list(
+        CartItem.objects.filter(cart__user=user).values_list("variant_id", "quantity", "variant__price")
+    )
+    return {
+        "id": payment_id,
+        "amount": to_minor_units(sum(price * qty for _, qty, price in lines)),
+        "metadata": {"user_id": str(user.id), "cart_hash": cart_hash(lines)},
+    }
+
+
+class FulfillPaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.variants = create_variants(25)
+
+    def make_cart(self, email, lines):
+        user = User.objects.create(email=email)
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, variant=variant, quantity=2) for variant in self.variants[:lines]
+        ])
+        return user
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        for email, lines in (("one@example.com", 1), ("many@example.com", 25)):
+            user = self.make_cart(email, lines)
+            reserve_cart(user)
+            intent = paid_intent(user)
+            with self.assertNumQueries(11):
+                fulfill_payment(intent)
+
+            self.assertEqual(RepairOrder.objects.filter(customer=user, status="paid").count(), lines)
+            self.assertFalse(CartItem.objects.filter(cart__user=user).exists())
+
+    def test_stock_is_deducted_when_reservation_is_gone(self):
+        user = self.make_cart("late@example.com", 3)
+        fulfill_payment(paid_intent(user))
+
+        stock = ServiceVariant.objects.filter(pk__in=[v.pk for v in self.variants[:3]])
+        self.assertEqual({v.stock for v in stock}, {8})
+
+
+class ReserveCartTests(TestCase):
+    def test_sold_out_retry_keeps_the_earlier_reservation(self):
+        variant, = create_variants(stock=5)
+        user = User.objects.create(email="buyer@example.com")
+        item = CartItem.objects.create(cart=Cart.objects.create(user=user), variant=variant, quantity=3)
+        reserve_cart(user)
+
+        CartItem.objects.filter(pk=item.pk).update(quantity=6)
+        with self.assertRaises(OutOfStock):
+            reserve_cart(user)
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock, 2)
+        self.assertEqual(StockReservation.objects.filter(status=StockReservation.HELD).count(), 1)
+
+        CartItem.objects.filter(pk=item.pk).update(quantity=2)
+        reserve_cart(user)
+        release_reservations(StockReservation.objects.filter(user=user))
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock, 5)
+
+
+class PayPalProviderTests(TestCase):
+    def answer(self, status):
+        response = requests.Response()
+        response.status_code = status
+        response._content = b'{"name": "REFUSED"}'
+        return response
+
+    def test_refusals_are_payment_errors(self):
+        provider = PayPalProvider()
+        provider.api = PooledPayPalApi(mode="sandbox", client_id="id", client_secret="secret", token="token")
+
+        for status in (401, 403, 404, 422):
+            with mock.patch.object(provider.api.session, "request", return_value=self.answer(status)):
+                with self.assertRaises(PaymentError) as raised:
+                    provider.create_payment(
+                        Decimal("10.00"), "usd", f"key-{status}",
+                        return_url="https://example.com/ok", cancel_url="https://example.com/cancel",
+                    )
+            self.assertNotIsInstance(raised.exception, ProviderUnavailable)
+
+
+class DownProvider(FakeProvider):
+    def create_payment(self, *args, **kwargs):
+        raise ProviderUnavailable("Fake is unavailable, try again shortly")
+
+
+@override_settings(
+    PAYMENT_PROVIDER="payment.providers.FakeProvider", CHECKOUT_CACHE_ALIAS="locmem"
+)
+class CheckoutTests(APITestCase):
+    def setUp(self):
+        caches["locmem"].clear()
+        self.variant, = create_variants(price=Decimal("12.50"))
+        self.user = User.objects.create(email="buyer@example.com")
+        self.item = CartItem.objects.create(
+            cart=Cart.objects.create(user=self.user), variant=self.variant, quantity=2
+        )
+        self.client.force_authenticate(self.user)
+
+    def checkout(self):
+        return self.client.post("/api/v1/payments/stripe/checkout/")
+
+    def test_retry_returns_the_same_payment_without_calling_the_provider(self):
+        first = self.checkout()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(Decimal(first.json()["amount"]), Decimal("25.00"))
+
+        provider = get_payment_provider()
+        with mock.patch.object(provider, "create_payment", wraps=provider.create_payment) as spy:
+            second = self.checkout()
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        spy.assert_not_called()
+        self.assertEqual(StockReservation.objects.filter(status=StockReservation.HELD).count(), 1)
+
+    def test_buying_the_same_cart_again_starts_a_new_payment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.checkout().json()
+            fulfill_payment(paid_intent(self.user, first["payment_id"]))
+
+        CartItem.objects.create(cart=self.user.cart, variant=self.variant, quantity=2)
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.json()["payment_id"], first["payment_id"])
+
+    def test_retry_after_a_cancelled_payment_starts_a_new_one(self):
+        first = self.checkout().json()
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_payment({
+                "id": first["payment_id"], "status": "canceled",
+                "metadata": {"user_id": str(self.user.id)},
+            })
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.json()["payment_id"], first["payment_id"])
+
+    def test_changed_cart_starts_a_new_payment(self):
+        first = self.checkout().json()
+        CartItem.objects.filter(pk=self.item.pk).update(quantity=3)
+        second = self.checkout().json()
+
+        self.assertNotEqual(second["payment_id"], first["payment_id"])
+        self.assertEqual(Decimal(second["amount"]), Decimal("37.50"))
+
+    def test_changed_cart_cancels_the_superseded_payment(self):
+        first = self.checkout().json()
+        superseded = paid_intent(self.user, first["payment_id"])
+        CartItem.objects.filter(pk=self.item.pk).update(quantity=3)
+        self.checkout()
+
+        provider = get_payment_provider()
+        statuses = {payment.id: payment.status for payment in provider.payments.values()}
+        self.assertEqual(statuses[first["payment_id"]], "canceled")
+
+        # confirmed in another tab before the cancel got through
+        self.assertEqual(fulfill_payment(superseded), [])
+        self.assertFalse(RepairOrder.objects.exists())
+        self.assertTrue(OutboxEvent.objects.filter(type="payment.refund_required").exists())
+
+    def test_second_payment_for_the_same_cart_creates_no_orders(self):
+        intent = paid_intent(self.user, self.checkout().json()["payment_id"])
+        fulfill_payment(intent)
+        self.assertEqual(fulfill_payment(dict(intent, id="pi_second")), [])
+
+        self.assertEqual(RepairOrder.objects.count(), 1)
+        self.assertEqual(OutboxEvent.objects.filter(type="payment.refund_required").count(), 1)
+
+    @override_settings(PAYMENT_PROVIDER="payment.tests.DownProvider")
+    def test_unavailable_provider_releases_the_reservation(self):
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(StockReservation.objects.filter(status=StockReservation.HELD).exists())
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 10)
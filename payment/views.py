@@ -1,46 +1,53 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from decimal import Decimal
-from cart.models import Cart
-from orders.models import RepairOrder
+import json
 import stripe
 from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, ValidationError
 from django.http import JsonResponse
-from orders.models import RepairOrder
-from common.redis import redis_client
-from users.models import User
+from cart.backends import get_cart_backend
+from users.authentication import ClaimsJWTAuthentication
+from services.inventory import OutOfStock
+from .checkout import start_checkout
+from .models import StripeEvent
+from .providers import PaymentError, ProviderUnavailable
+from .tasks import process_stripe_event
+
+
+class PaymentUnavailable(APIException):
+    status_code = 503
+    default_detail = "Payments are unavailable right now, please try again shortly."
+    default_code = "payment_unavailable"
+
 
 class StripeCheckoutView(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def post(self, request):
-        stripe.api_key = settings.STRIPE_SECRET_KEY
         user = request.user
-        cart = Cart.objects.get(user=user)
-
-        for item in cart.items.all():
-            lock_key = f"lock:variant:{item.variant.id}"
-            lock = redis_client.lock(lock_key, timeout=10)
+        get_cart_backend().flush(user)
 
-            if not lock.acquire(blocking=False):
-                raise ValidationError("This service is currently being booked. Try again.")
+        try:
+            checkout, created = start_checkout(user)
+        except OutOfStock:
+            raise ValidationError("Service sold out")
+        except ProviderUnavailable:
+            raise PaymentUnavailable()
+        except PaymentError as exc:
+            raise ValidationError(str(exc))
 
-            try:
-                with transaction.atomic():
-                    item.variant.refresh_from_db()
+        if checkout is None:
+            raise ValidationError("Your cart is empty")
 
-                    if item.variant.stock < item.quantity:
-                        raise ValidationError("Service sold out")
-
-                    item.variant.stock -= item.quantity
-                    item.variant.save()
-
-            finally:
-                lock.release()
+        # a retry of the same cart gets the payment that was already started
+        return Response(
+            {key: value for key, value in checkout.items() if key != "cart_hash"},
+            status=201 if created else 200,
+        )
 
 
 @csrf_exempt
@@ -58,23 +65,13 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError:
         return JsonResponse({"error": "Invalid signature"}, status=400)
 
-    if event['type'] == 'payment_intent.succeeded':
-        intent = event['data']['object']
-        user_id = intent.metadata.user_id
-        user = User.objects.get(id=user_id)
-        cart = Cart.objects.get(user=user)
+    stored, created = StripeEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={"type": event['type'], "payload": json.loads(payload)},
+    )
 
-        with transaction.atomic():
-            for item in cart.items.all():
-                RepairOrder.objects.create(
-                    customer=user,
-                    vendor=item.variant.service.vendor,
-                    variant=item.variant,
-                    total_amount=item.variant.price * item.quantity,
-                    status="paid"
-                )
-                item.variant.stock -= item.quantity
-                item.variant.save()
-            cart.items.all().delete()
+    # a retried delivery is only queued again if nobody has picked it up yet
+    if created or stored.status == StripeEvent.RECEIVED:
+        transaction.on_commit(lambda: process_stripe_event.delay(stored.event_id))
 
-    return JsonResponse({"status": "success"}, status=200)
\ No newline at end of file
+    return JsonResponse({"status": "success"}, status=200)
@@ -0,0 +1,125 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from .models import SearchDocument
+
+FTS_TABLE = "search_searchdocument_fts"
+
+
+def _active(queryset, active_only):
+    if active_only:
+        return queryset.filter(service__is_active=True, service__vendor__is_active=True)
+    return queryset
+
+
+class SqliteSearchBackend:
+    """FTS5 index kept in sync with SearchDocument by triggers, ranked with bm25."""
+
+    # bm25 column weights: title, variants, vendor_name, body
+    weights = (10.0, 4.0, 4.0, 1.0)
+
+    def prepare(self, service_ids):
+        pass
+
+    def match_expression(self, query):
+        # every word must match, as a prefix; quoting keeps FTS5 syntax out
+        words = re.findall(r"\w+", query)
+        return " ".join(f'"{word}"*' for word in words)
+
+    def search(self, query, limit, offset=0, active_only=True):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+
+        sql = (
+            f"SELECT f.rowid FROM {FTS_TABLE} f "
+            "JOIN services_service s ON s.id = f.rowid "
+            "JOIN vendors_vendorprofile v ON v.id = s.vendor_id "
+            f"WHERE {FTS_TABLE} MATCH %s "
+            + ("AND s.is_active AND v.is_active " if active_only else "")
+            + f"ORDER BY bm25({FTS_TABLE}, {', '.join(str(w) for w in self.weights)}) "
+            "LIMIT %s OFFSET %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [expression, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, services, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return services.none()
+        return services.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]
+        ))
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+class PostgresSearchBackend:
+    """tsvector column with a GIN index, ranked with ts_rank."""
+
+    def prepare(self, service_ids):
+        SearchDocument.objects.filter(service_id__in=service_ids).update(
+            search_vector=(
+                SearchVector("title", weight="A")
+                + SearchVector("variants", weight="B")
+                + SearchVector("vendor_name", weight="B")
+                + SearchVector("body", weight="C")
+            )
+        )
+
+    def search(self, query, limit, offset=0, active_only=True):
+        search_query = SearchQuery(query, search_type="websearch")
+        documents = _active(SearchDocument.objects.filter(search_vector=search_query), active_only)
+        return list(
+            documents.annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank")
+            .values_list("service_id", flat=True)[offset:offset + limit]
+        )
+
+    def filter(self, services, query):
+        return services.filter(
+            search_document__search_vector=SearchQuery(query, search_type="websearch")
+        )
+
+    def optimize(self):
+        pass
+
+
+class BasicSearchBackend:
+    """Fallback for other databases: unranked LIKE scans."""
+
+    def prepare(self, service_ids):
+        pass
+
+    def _matching(self, documents, query, prefix=""):
+        for word in query.split():
+            documents = documents.filter(
+                Q(**{f"{prefix}title__icontains": word}) | Q(**{f"{prefix}variants__icontains": word})
+                | Q(**{f"{prefix}vendor_name__icontains": word}) | Q(**{f"{prefix}body__icontains": word})
+            )
+        return documents
+
+    def search(self, query, limit, offset=0, active_only=True):
+        documents = self._matching(SearchDocument.objects.all(), query)
+        return list(
+            _active(documents, active_only).values_list("service_id", flat=True)[offset:offset + limit]
+        )
+
+    def filter(self, services, query):
+        return self._matching(services, query, prefix="search_document__")
+
+    def optimize(self):
+        pass
+
+
+def get_search_backend():
+    if connection.vendor == "sqlite":
+        return SqliteSearchBackend()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return BasicSearchBackend()
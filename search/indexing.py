@@ -0,0 +1,54 @@
+from django.db import transaction
+from services.models import Service
+from .backends import get_search_backend
+from .models import SearchDocument
+
+
+def index_services(service_ids):
+    """(Re)build the search documents of the given services in a few bulk queries."""
+    service_ids = set(service_ids)
+    if not service_ids:
+        return 0
+
+    services = (
+        Service.objects.filter(pk__in=service_ids)
+        .select_related("vendor")
+        .prefetch_related("variants")
+    )
+    documents = [
+        SearchDocument(
+            service=service,
+            title=service.name,
+            variants=" ".join(variant.name for variant in service.variants.all()),
+            vendor_name=service.vendor.business_name,
+            body=service.description,
+        )
+        for service in services
+    ]
+
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=["service"],
+            update_fields=["title", "variants", "vendor_name", "body", "updated_at"],
+        )
+        get_search_backend().prepare([document.service_id for document in documents])
+
+    return len(documents)
+
+
+def schedule_index(service_ids):
+    # after commit, so the index never sees rows that get rolled back
+    service_ids = set(service_ids)
+    if service_ids:
+        transaction.on_commit(lambda: index_services(service_ids))
+
+
+def search_service_ids(query, limit=20, offset=0, active_only=True):
+    return get_search_backend().search(query, limit, offset, active_only)
+
+
+def filter_services(services, query):
+    """Narrow a Service queryset to the matches for ``query``, unranked and without a limit."""
+    return get_search_backend().filter(services, query)
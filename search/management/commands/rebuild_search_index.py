@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from services.models import Service
+from search.backends import get_search_backend
+from search.indexing import index_services
+
+
+class Command(BaseCommand):
+    help = "Rebuild the service search index in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_pk = 0
+        indexed = 0
+
+        # keyset pagination over the primary key keeps every chunk an index range scan
+        while True:
+            ids = list(
+                Service.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            indexed += index_services(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f"Indexed {indexed} services")
+
+        get_search_backend().optimize()
+
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt: {indexed} services"))
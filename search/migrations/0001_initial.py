@@ -0,0 +1,78 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:47
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_COLUMNS = "title, variants, vendor_name, body"
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5("
+    f"{FTS_COLUMNS}, content='search_searchdocument', content_rowid='service_id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument BEGIN "
+    f"INSERT INTO search_searchdocument_fts(rowid, {FTS_COLUMNS}) "
+    "VALUES (new.service_id, new.title, new.variants, new.vendor_name, new.body); END",
+    "CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument BEGIN "
+    f"INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, {FTS_COLUMNS}) "
+    "VALUES ('delete', old.service_id, old.title, old.variants, old.vendor_name, old.body); END",
+    "CREATE TRIGGER search_searchdocument_au AFTER UPDATE ON search_searchdocument BEGIN "
+    f"INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, {FTS_COLUMNS}) "
+    "VALUES ('delete', old.service_id, old.title, old.variants, old.vendor_name, old.body); "
+    f"INSERT INTO search_searchdocument_fts(rowid, {FTS_COLUMNS}) "
+    "VALUES (new.service_id, new.title, new.variants, new.vendor_name, new.body); END",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS search_searchdocument_au",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ai",
+    "DROP TABLE IF EXISTS search_searchdocument_fts",
+]
+
+POSTGRES_FORWARDS = [
+    "CREATE INDEX search_searchdocument_vector_idx "
+    "ON search_searchdocument USING gin (search_vector)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS search_searchdocument_vector_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_index_structures(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_FORWARDS, "postgresql": POSTGRES_FORWARDS})
+
+
+def drop_index_structures(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_BACKWARDS, "postgresql": POSTGRES_BACKWARDS})
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('services', '0002_service_updated_at_servicevariant_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='services.service')),
+                ('title', models.CharField(max_length=255)),
+                ('variants', models.TextField(blank=True)),
+                ('vendor_name', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_index_structures, drop_index_structures),
+    ]
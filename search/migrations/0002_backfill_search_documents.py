@@ -0,0 +1,57 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    Service = apps.get_model("services", "Service")
+    SearchDocument = apps.get_model("search", "SearchDocument")
+
+    last_pk = 0
+    while True:
+        services = list(
+            Service.objects.filter(pk__gt=last_pk)
+            .select_related("vendor")
+            .prefetch_related("variants")
+            .order_by("pk")[:BATCH_SIZE]
+        )
+        if not services:
+            break
+
+        # the FTS5 triggers index every inserted row on SQLite
+        SearchDocument.objects.bulk_create(
+            [
+                SearchDocument(
+                    service=service,
+                    title=service.name,
+                    variants=" ".join(variant.name for variant in service.variants.all()),
+                    vendor_name=service.vendor.business_name,
+                    body=service.description,
+                )
+                for service in services
+            ],
+            ignore_conflicts=True,
+        )
+        last_pk = services[-1].pk
+
+    if schema_editor.connection.vendor == "postgresql":
+        SearchDocument.objects.update(
+            search_vector=(
+                SearchVector("title", weight="A")
+                + SearchVector("variants", weight="B")
+                + SearchVector("vendor_name", weight="B")
+                + SearchVector("body", weight="C")
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+from services.models import Service
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalized text of one service. On SQLite an FTS5 table mirrors it
+    through triggers (see migrations); on Postgres search_vector is filled
+    in and GIN-indexed.
+    """
+    service = models.OneToOneField(
+        Service, on_delete=models.CASCADE, primary_key=True, related_name="search_document"
+    )
+    title = models.CharField(max_length=255)
+    variants = models.TextField(blank=True)
+    vendor_name = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from services.models import Service, ServiceVariant
+from vendors.models import VendorProfile
+from .indexing import schedule_index
+
+
+@receiver(post_save, sender=Service)
+def index_service(sender, instance, **kwargs):
+    schedule_index([instance.pk])
+
+
+@receiver(post_save, sender=ServiceVariant)
+@receiver(post_delete, sender=ServiceVariant)
+def index_variant_service(sender, instance, **kwargs):
+    schedule_index([instance.service_id])
+
+
+@receiver(post_save, sender=VendorProfile)
+def index_vendor_services(sender, instance, created, **kwargs):
+    if not created:
+        schedule_index(instance.services.values_list("pk", flat=True))
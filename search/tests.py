@@ -0,0 +1,22 @@
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from common.testing import create_vendor
+from services.models import Service
+from .indexing import index_services
+
+
+class ServiceAdminSearchTests(TestCase):
+    def test_results_are_not_capped(self):
+        vendor = create_vendor()
+        services = Service.objects.bulk_create([
+            Service(vendor=vendor, name=f"Screen repair {i}", description="-") for i in range(1200)
+        ])
+        Service.objects.bulk_create([Service(vendor=vendor, name="Battery swap", description="-")])
+        index_services(service.pk for service in Service.objects.all())
+
+        model_admin = site._registry[Service]
+        results, _ = model_admin.get_search_results(
+            RequestFactory().get("/"), Service.objects.all(), "screen"
+        )
+
+        self.assertEqual(results.count(), len(services))
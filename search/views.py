@@ -0,0 +1,44 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from services.models import Service
+from services.serializers import CatalogServiceSerializer
+from .indexing import search_service_ids
+
+
+class SearchView(APIView):
+    """GET /search/?q=screen repair&limit=20&offset=0, best match first."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    max_limit = 100
+
+    def _int_param(self, name, default):
+        value = self.request.query_params.get(name, default)
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            raise ValidationError({name: "Must be a whole number."})
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "A search term is required."})
+
+        limit = min(self._int_param("limit", 20), self.max_limit)
+        offset = self._int_param("offset", 0)
+
+        ids = search_service_ids(query, limit=limit, offset=offset)
+        services = (
+            Service.objects.select_related("vendor")
+            .prefetch_related("variants")
+            .in_bulk(ids)
+        )
+        ranked = [services[pk] for pk in ids if pk in services]
+
+        return Response({
+            "query": query,
+            "limit": limit,
+            "offset": offset,
+            "results": CatalogServiceSerializer(ranked, many=True).data,
+        })
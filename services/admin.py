@@ -1,15 +1,52 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models.functions import Now
+from common.admin import LargeTableAdmin
+from .cache import invalidate
+from .listings import schedule_refresh
 from .models import Service, ServiceVariant
 from vendors.models import VendorProfile
+from search.indexing import filter_services
+
+
+def set_active(modeladmin, request, queryset, is_active):
+    # one UPDATE; post_save doesn't fire, so the catalog listings and the
+    # cached services are refreshed here
+    service_ids = list(queryset.values_list("pk", flat=True))
+    updated = queryset.update(is_active=is_active, updated_at=Now())
+    schedule_refresh(service_ids)
+    invalidate("service", service_ids)
+    modeladmin.message_user(request, f"{updated} service(s) updated.", messages.SUCCESS)
+
+
+@admin.action(description="Activate selected services")
+def activate_services(modeladmin, request, queryset):
+    set_active(modeladmin, request, queryset, True)
+
+
+@admin.action(description="Deactivate selected services")
+def deactivate_services(modeladmin, request, queryset):
+    set_active(modeladmin, request, queryset, False)
+
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(LargeTableAdmin):
     list_display = ["name", "vendor", "is_active"]
+    list_select_related = ["vendor"]
+    actions = [activate_services, deactivate_services]
     list_filter = ["is_active"]
     search_fields = ["name", "vendor__business_name"]
 
+    def get_search_results(self, request, queryset, search_term):
+        # served from the full-text index instead of icontains scans
+        if not search_term:
+            return queryset, False
+        return filter_services(queryset, search_term), False
+
+
 @admin.register(ServiceVariant)
-class ServiceVariantAdmin(admin.ModelAdmin):
+class ServiceVariantAdmin(LargeTableAdmin):
     list_display = ["name", "service", "price", "stock"]
-    list_filter = ["service"]
+    list_select_related = ["service"]
+    # only services that have variants, rather than every service
+    list_filter = [("service", admin.RelatedOnlyFieldListFilter)]
     search_fields = ["name", "service__name"]
@@ -0,0 +1,225 @@
+"""
+Two-tier cache for the variant, service and vendor fields hot paths read over
+and over (prices, names, active flags): a small LRU in each process, in front
+of Redis, in front of the database.
+
+Stock is left out on purpose. Cached variants come back with it deferred, so
+reading it still goes to the database, and reservations take it with a
+conditional UPDATE anyway.
+
+A write drops the entry from both tiers straight away and again once the
+transaction commits, when it is also published so every other process drops
+its local copy. The local TTL bounds how stale a process can get if it misses
+a message; while Redis is unreachable the database is read instead.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from common.redis import redis_client
+from vendors.models import VendorProfile
+from .models import Service, ServiceVariant
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "hot:invalidate"
+
+# columns cached per kind, in model field order; the rest stay deferred
+CACHED_FIELDS = {
+    "variant": (ServiceVariant, ("id", "service_id", "name", "price", "estimated_minutes")),
+    "service": (Service, ("id", "vendor_id", "name", "is_active")),
+    "vendor": (VendorProfile, ("id", "business_name", "is_active")),
+}
+
+# how long to leave Redis alone after it failed, and to wait before resubscribing
+REDIS_RETRY_SECONDS = 5
+
+
+class LocalLRU:
+    """Bounded, thread-safe LRU whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, values):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalLRU(settings.HOT_CACHE_LOCAL_SIZE, settings.HOT_CACHE_LOCAL_TTL)
+
+_listener_lock = threading.Lock()
+_listener_pid = None
+_redis_retry_at = 0
+
+
+def _ensure_listener():
+    """Subscribe this process to invalidations, once per process (forked workers included)."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        # entries inherited through a fork were never covered by a subscription
+        local_cache.clear()
+        _listener_pid = os.getpid()
+        threading.Thread(target=_listen, name="hot-cache-invalidations", daemon=True).start()
+
+
+def _listen():
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            for message in pubsub.listen():
+                local_cache.delete_many(message["data"].split(","))
+        except redis.RedisError:
+            # whatever was published while we were disconnected is lost
+            local_cache.clear()
+            time.sleep(REDIS_RETRY_SECONDS)
+
+
+def _redis_failed(exc):
+    global _redis_retry_at
+    if time.monotonic() >= _redis_retry_at:
+        logger.warning("Hot-object cache is reading from the database, Redis failed: %s", exc)
+    _redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def _redis_get(keys):
+    if time.monotonic() < _redis_retry_at:
+        return {}
+    try:
+        values = redis_client.mget(keys)
+    except redis.RedisError as exc:
+        _redis_failed(exc)
+        return {}
+    return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+
+def _redis_set(values):
+    if not values or time.monotonic() < _redis_retry_at:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(key, json.dumps(value, cls=DjangoJSONEncoder), ex=settings.HOT_CACHE_TTL)
+        pipe.execute()
+    except redis.RedisError as exc:
+        _redis_failed(exc)
+
+
+def _key(kind, pk):
+    return f"hot:{kind}:{pk}"
+
+
+def _lookup(kind, ids):
+    """{pk: {field: value}} of the rows of one kind, through both tiers. Unknown ids are left out."""
+    _ensure_listener()
+    model, fields = CACHED_FIELDS[kind]
+    keys = {_key(kind, pk): pk for pk in ids}
+
+    found = local_cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        shared = _redis_get(missing)
+        local_cache.set_many(shared)
+        found.update(shared)
+        missing = [key for key in missing if key not in shared]
+    if missing:
+        rows = model.objects.filter(pk__in=[keys[key] for key in missing]).values(*fields)
+        loaded = {_key(kind, row["id"]): row for row in rows}
+        _redis_set(loaded)
+        local_cache.set_many(loaded)
+        found.update(loaded)
+
+    return {keys[key]: data for key, data in found.items()}
+
+
+def _instance(kind, data):
+    model, fields = CACHED_FIELDS[kind]
+    values = [model._meta.get_field(name).to_python(data[name]) for name in fields]
+    return model.from_db(None, fields, values)
+
+
+def get_variants(ids):
+    """
+    {pk: ServiceVariant} for ``ids`` with .service and .service.vendor attached,
+    as far as price, names and active flags go. Unknown ids are left out.
+    """
+    variants = _lookup("variant", {int(pk) for pk in ids})
+    services = _lookup("service", {data["service_id"] for data in variants.values()})
+    vendors = _lookup("vendor", {data["vendor_id"] for data in services.values()})
+
+    result = {}
+    for pk, data in variants.items():
+        service_data = services.get(data["service_id"])
+        if service_data is None or service_data["vendor_id"] not in vendors:
+            continue
+        variant = _instance("variant", data)
+        variant.service = _instance("service", service_data)
+        variant.service.vendor = _instance("vendor", vendors[service_data["vendor_id"]])
+        result[pk] = variant
+    return result
+
+
+def _drop(keys, announce=False):
+    local_cache.delete_many(keys)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        if announce:
+            pipe.publish(CHANNEL, ",".join(keys))
+        pipe.execute()
+    except redis.RedisError as exc:
+        _redis_failed(exc)
+
+
+def invalidate(kind, ids):
+    """Forget cached rows of one kind now, and everywhere once the transaction commits."""
+    keys = [_key(kind, pk) for pk in ids]
+    if not keys:
+        return
+    # dropped again after commit: a read in between may have cached the old row
+    _drop(keys)
+    transaction.on_commit(lambda: _drop(keys, announce=True))
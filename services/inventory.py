@@ -0,0 +1,331 @@
+import logging
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+from django.utils.module_loading import import_string
+from common.redis import redis_client
+from .listings import mark_stock_changed
+from .models import ServiceVariant
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def get_inventory_backend():
+    return import_string(settings.INVENTORY_BACKEND)()
+
+
+def _quantity_case(quantities):
+    # per-variant amount, so every variant is handled by the same statement
+    return Case(
+        *[When(pk=variant_id, then=Value(qty)) for variant_id, qty in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+_local = threading.local()
+
+
+@contextmanager
+def stock_atomic():
+    """
+    transaction.atomic() for blocks that take stock. take_stock() has to
+    change the counters right away to know whether there is enough, and
+    counters kept outside the database don't roll back with it, so when the
+    block fails whatever it took is given back.
+    """
+    journals = _local.__dict__.setdefault("journals", [])
+    taken = []
+    journals.append(taken)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        backend = get_inventory_backend()
+        for quantities in taken:
+            backend.untake(quantities)
+        raise
+    finally:
+        journals.pop()
+    if journals:
+        # only final once the enclosing block commits
+        journals[-1].extend(taken)
+
+
+def take_stock(quantities):
+    """
+    Take stock for every {variant_id: quantity} pair at once. If any variant
+    falls short nothing is taken and OutOfStock is raised. Run it inside
+    stock_atomic().
+    """
+    if quantities:
+        get_inventory_backend().take(quantities)
+        journals = getattr(_local, "journals", None)
+        if journals:
+            journals[-1].append(quantities)
+
+
+def deduct_stock(quantities):
+    """Decrement stock unconditionally, e.g. for orders that are already paid for."""
+    if quantities:
+        get_inventory_backend().adjust({pk: -qty for pk, qty in quantities.items()})
+
+
+def give_back_stock(quantities):
+    """Return stock for every {variant_id: quantity} pair."""
+    if quantities:
+        get_inventory_backend().adjust(quantities)
+
+
+def shift_stock(deltas):
+    """
+    The vendor changed ServiceVariant.stock by {variant_id: delta}; move the
+    available stock by as much once the edit commits. Held reservations and
+    sales not yet reconciled stay counted.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: get_inventory_backend().shift(deltas))
+
+
+def reconcile_stock(batch_size=None):
+    return get_inventory_backend().reconcile(batch_size or settings.INVENTORY_RECONCILE_BATCH_SIZE)
+
+
+class DatabaseInventory:
+    """Stock is ServiceVariant.stock, changed with one UPDATE per call."""
+
+    def take(self, quantities):
+        # the update only touches rows that still have enough stock; if any
+        # variant falls short the whole statement is rolled back
+        amount = _quantity_case(quantities)
+        with transaction.atomic():
+            updated = ServiceVariant.objects.filter(
+                pk__in=quantities.keys(), stock__gte=amount
+            ).update(stock=F("stock") - amount, updated_at=Now())
+
+            if updated != len(quantities):
+                raise OutOfStock("Service sold out")
+
+        mark_stock_changed(quantities)
+
+    def untake(self, quantities):
+        # rolled back with the transaction
+        pass
+
+    def adjust(self, deltas):
+        amount = _quantity_case(deltas)
+        ServiceVariant.objects.filter(pk__in=deltas.keys()).update(
+            stock=F("stock") + amount, updated_at=Now()
+        )
+        mark_stock_changed(deltas)
+
+    def shift(self, deltas):
+        # the edit itself wrote the stock
+        pass
+
+    def reconcile(self, batch_size):
+        return {"variants": 0, "drifted": 0}
+
+
+# KEYS[1] is the hash of pending deltas and KEYS[2..] one counter per variant;
+# ARGV holds the variant ids followed by one number per variant.
+
+TAKE_SCRIPT = redis_client.register_script("""
+local n = #KEYS - 1
+local missing = {}
+for i = 1, n do
+    if redis.call("EXISTS", KEYS[i + 1]) == 0 then
+        table.insert(missing, ARGV[i])
+    end
+end
+if #missing > 0 then
+    return {"missing", unpack(missing)}
+end
+for i = 1, n do
+    if tonumber(redis.call("GET", KEYS[i + 1])) < tonumber(ARGV[n + i]) then
+        return {"short", ARGV[i]}
+    end
+end
+for i = 1, n do
+    redis.call("DECRBY", KEYS[i + 1], ARGV[n + i])
+    redis.call("HINCRBY", KEYS[1], ARGV[i], -tonumber(ARGV[n + i]))
+end
+return {"ok"}
+""")
+
+ADJUST_SCRIPT = redis_client.register_script("""
+local n = #KEYS - 1
+for i = 1, n do
+    if redis.call("EXISTS", KEYS[i + 1]) == 1 then
+        redis.call("INCRBY", KEYS[i + 1], ARGV[n + i])
+    end
+    redis.call("HINCRBY", KEYS[1], ARGV[i], ARGV[n + i])
+end
+return n
+""")
+
+# database stock plus what is still pending; ARGV ends with "1" to overwrite
+SEED_SCRIPT = redis_client.register_script("""
+local n = #KEYS - 1
+local overwrite = ARGV[2 * n + 1] == "1"
+for i = 1, n do
+    local available = tonumber(ARGV[n + i]) + tonumber(redis.call("HGET", KEYS[1], ARGV[i]) or 0)
+    if overwrite then
+        redis.call("SET", KEYS[i + 1], available)
+    else
+        redis.call("SET", KEYS[i + 1], available, "NX")
+    end
+end
+return n
+""")
+
+# a vendor's edit is already in the database, so only the counter moves
+SHIFT_SCRIPT = redis_client.register_script("""
+local n = #KEYS - 1
+for i = 1, n do
+    if redis.call("EXISTS", KEYS[i + 1]) == 1 then
+        redis.call("INCRBY", KEYS[i + 1], ARGV[n + i])
+    end
+end
+return n
+""")
+
+# hands over each variant's pending delta and its counter ("" when unset)
+COLLECT_SCRIPT = redis_client.register_script("""
+local n = #KEYS - 1
+local result = {}
+for i = 1, n do
+    table.insert(result, redis.call("HGET", KEYS[1], ARGV[i]) or "0")
+    table.insert(result, redis.call("GET", KEYS[i + 1]) or "")
+    redis.call("HDEL", KEYS[1], ARGV[i])
+end
+return result
+""")
+
+
+class RedisInventory:
+    """
+    Available stock lives in Redis, one counter per variant, so checkouts of
+    the same variant don't queue on its row. Counters change only through
+    Lua scripts, and a take never drops one below zero. Every change is also
+    added to a hash of pending deltas that reconcile() writes to
+    ServiceVariant.stock in batches, which therefore lags the counters.
+
+    A counter missing from Redis is seeded from the database plus whatever
+    is still pending for it.
+
+    Redis doesn't roll back with the database: adjustments are applied when
+    the transaction commits, and takes are given back by stock_atomic() if
+    the block that made them fails.
+    """
+
+    pending_key = "inventory:pending"
+
+    def _key(self, variant_id):
+        return f"inventory:stock:{variant_id}"
+
+    def _keys(self, variant_ids):
+        return [self.pending_key] + [self._key(pk) for pk in variant_ids]
+
+    def _run(self, script, values, *extra):
+        variant_ids = list(values)
+        return script(
+            keys=self._keys(variant_ids),
+            args=variant_ids + [values[pk] for pk in variant_ids] + list(extra),
+        )
+
+    def _seed(self, stocks, overwrite=False):
+        self._run(SEED_SCRIPT, stocks, "1" if overwrite else "0")
+
+    def take(self, quantities):
+        for _ in range(2):
+            status, *variant_ids = self._run(TAKE_SCRIPT, quantities)
+            if status == "ok":
+                return
+            if status == "short":
+                raise OutOfStock("Service sold out")
+            self._seed(dict(
+                ServiceVariant.objects.filter(pk__in=variant_ids).values_list("pk", "stock")
+            ))
+        raise OutOfStock("Service sold out")
+
+    def untake(self, quantities):
+        self._run(ADJUST_SCRIPT, quantities)
+
+    def adjust(self, deltas):
+        # only once the change that gave the stock back or sold it commits
+        transaction.on_commit(lambda: self._run(ADJUST_SCRIPT, deltas))
+
+    def shift(self, deltas):
+        self._run(SHIFT_SCRIPT, deltas)
+
+    def reconcile(self, batch_size):
+        """Reconcile every variant, a batch of ids at a time."""
+        checked, drifted = 0, 0
+        last_pk = 0
+        while True:
+            variant_ids = list(
+                ServiceVariant.objects.filter(pk__gt=last_pk)
+                .order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not variant_ids:
+                break
+
+            drifted += len(self.reconcile_batch(variant_ids))
+            checked += len(variant_ids)
+            last_pk = variant_ids[-1]
+
+        return {"variants": checked, "drifted": drifted}
+
+    def reconcile_batch(self, variant_ids):
+        """
+        Write the pending deltas of ``variant_ids`` to the database, then check
+        every counter against the stock that results. A counter that disagrees
+        has drifted, e.g. because stock was edited in the admin, and is reset
+        from the database. Returns {variant_id: stock} of the drifted ones.
+        """
+        collected = COLLECT_SCRIPT(keys=self._keys(variant_ids), args=variant_ids)
+        deltas, counters = {}, {}
+        for pk, delta, counter in zip(variant_ids, collected[::2], collected[1::2]):
+            if int(delta):
+                deltas[pk] = int(delta)
+            if counter != "":
+                counters[pk] = int(counter)
+
+        try:
+            with transaction.atomic():
+                if deltas:
+                    amount = _quantity_case(deltas)
+                    ServiceVariant.objects.filter(pk__in=deltas.keys()).update(
+                        stock=F("stock") + amount, updated_at=Now()
+                    )
+                    mark_stock_changed(deltas)
+                stocks = dict(
+                    ServiceVariant.objects.filter(pk__in=variant_ids).values_list("pk", "stock")
+                )
+        except Exception:
+            # the deltas were handed over but never written: put them back
+            pipe = redis_client.pipeline()
+            for pk, delta in deltas.items():
+                pipe.hincrby(self.pending_key, pk, delta)
+            pipe.execute()
+            raise
+
+        drifted = {
+            pk: stocks[pk] for pk, counter in counters.items()
+            if pk in stocks and counter != stocks[pk]
+        }
+        if drifted:
+            logger.warning(
+                "Inventory counters drifted from the database, reset: %s",
+                ", ".join(f"variant {pk}: {counters[pk]} -> {stock}" for pk, stock in drifted.items()),
+            )
+            self._seed(drifted, overwrite=True)
+        return drifted
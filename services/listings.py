@@ -0,0 +1,137 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, Greatest
+from redis.exceptions import RedisError
+from common.cache import bump_namespaces
+from common.redis import redis_client
+from .models import Service, ServiceListing, ServiceVariant
+
+logger = logging.getLogger(__name__)
+
+# variant ids whose stock changed since their listing was last refreshed
+STALE_KEY = "listings:stale"
+
+
+# what a catalog page shows of a listing, apart from the stock figures
+CATALOG_FIELDS = (
+    "name", "vendor_id", "vendor_name", "vendor_is_active", "is_active", "min_price", "variant_count",
+)
+
+
+def refresh_listings(service_ids):
+    """
+    Recompute the listing rows of the given services with one aggregate query
+    and one upsert. Cached catalog pages are only invalidated when a listing
+    appears, disappears or changes more than its stock, which would otherwise
+    throw them all away on every sale; their stock figures can lag by up to
+    RESPONSE_CACHE_TIMEOUT. A service's own page is always invalidated.
+    """
+    service_ids = set(service_ids)
+    if not service_ids:
+        return 0
+
+    before = {
+        row[0]: row[1:]
+        for row in ServiceListing.objects.filter(service_id__in=service_ids)
+        .values_list("service_id", *CATALOG_FIELDS)
+    }
+
+    services = (
+        Service.objects.filter(pk__in=service_ids)
+        .values("pk", "name", "is_active", "vendor_id", "vendor__business_name", "vendor__is_active")
+        .annotate(
+            min_price=Min("variants__price"),
+            total_stock=Coalesce(Sum("variants__stock"), 0),
+            variant_count=Count("variants"),
+            changed_at=Greatest(
+                "updated_at",
+                "vendor__updated_at",
+                Coalesce(Max("variants__updated_at"), "updated_at"),
+            ),
+        )
+    )
+    listings = [
+        ServiceListing(
+            service_id=row["pk"],
+            name=row["name"],
+            vendor_id=row["vendor_id"],
+            vendor_name=row["vendor__business_name"],
+            vendor_is_active=row["vendor__is_active"],
+            is_active=row["is_active"],
+            min_price=row["min_price"],
+            total_stock=row["total_stock"],
+            variant_count=row["variant_count"],
+            updated_at=row["changed_at"],
+        )
+        for row in services
+    ]
+
+    ServiceListing.objects.bulk_create(
+        listings,
+        update_conflicts=True,
+        unique_fields=["service"],
+        update_fields=[
+            "name", "vendor", "vendor_name", "vendor_is_active", "is_active",
+            "min_price", "total_stock", "variant_count", "updated_at",
+        ],
+    )
+    after = {
+        listing.service_id: tuple(getattr(listing, name) for name in CATALOG_FIELDS)
+        for listing in listings
+    }
+    namespaces = [f"catalog:service:{pk}" for pk in service_ids]
+    if before != after:
+        namespaces.append("catalog")
+    bump_namespaces(namespaces)
+    return len(listings)
+
+
+def schedule_refresh(service_ids):
+    service_ids = set(service_ids)
+    if service_ids:
+        transaction.on_commit(lambda: refresh_listings(service_ids))
+
+
+def _refresh_for_variants(variant_ids):
+    return refresh_listings(
+        ServiceVariant.objects.filter(pk__in=variant_ids).values_list("service_id", flat=True)
+    )
+
+
+def mark_stock_changed(variant_ids):
+    """
+    Stock changes come with every reservation, release and sale, so instead
+    of refreshing listings each time, the variants are queued and
+    refresh_stale_listings() catches their listings up in one pass.
+    """
+    variant_ids = {str(pk) for pk in variant_ids}
+    if variant_ids:
+        transaction.on_commit(lambda: _queue_stale(variant_ids))
+
+
+def _queue_stale(variant_ids):
+    try:
+        redis_client.sadd(STALE_KEY, *variant_ids)
+    except RedisError as exc:
+        logger.warning("Could not queue listing refreshes, refreshing now: %s", exc)
+        _refresh_for_variants(variant_ids)
+
+
+def refresh_stale_listings(batch_size=None):
+    """Refresh the listings of every variant whose stock changed since the last run."""
+    batch_size = batch_size or settings.LISTING_REFRESH_BATCH_SIZE
+    refreshed = 0
+    while True:
+        variant_ids = redis_client.spop(STALE_KEY, batch_size)
+        if not variant_ids:
+            break
+        try:
+            refreshed += _refresh_for_variants(variant_ids)
+        except Exception:
+            redis_client.sadd(STALE_KEY, *variant_ids)
+            raise
+        if len(variant_ids) < batch_size:
+            break
+    return refreshed
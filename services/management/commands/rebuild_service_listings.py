@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from services.listings import refresh_listings
+from services.models import Service, ServiceListing
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ServiceListing read model in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_pk = 0
+        refreshed = 0
+
+        while True:
+            ids = list(
+                Service.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            refreshed += refresh_listings(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f"Refreshed {refreshed} listings")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Service listings rebuilt: {refreshed} of {ServiceListing.objects.count()} rows"
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL = """
+INSERT INTO services_servicelisting (
+    service_id, name, vendor_id, vendor_name, vendor_is_active, is_active,
+    min_price, total_stock, variant_count, updated_at
+)
+SELECT s.id, s.name, s.vendor_id, v.business_name, v.is_active, s.is_active,
+       MIN(sv.price), COALESCE(SUM(sv.stock), 0), COUNT(sv.id), s.updated_at
+FROM services_service s
+JOIN vendors_vendorprofile v ON v.id = s.vendor_id
+LEFT JOIN services_servicevariant sv ON sv.service_id = s.id
+GROUP BY s.id, s.name, s.vendor_id, v.business_name, v.is_active, s.is_active, s.updated_at
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_service_updated_at_servicevariant_updated_at'),
+        ('vendors', '0002_vendorprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceListing',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='services.service')),
+                ('name', models.CharField(max_length=255)),
+                ('vendor_name', models.CharField(max_length=255)),
+                ('vendor_is_active', models.BooleanField(default=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('total_stock', models.IntegerField(default=0)),
+                ('variant_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vendors.vendorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_active', 'vendor_is_active', 'min_price'], name='services_se_is_acti_2b28b3_idx'), models.Index(fields=['vendor', 'is_active'], name='services_se_vendor__86a576_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
@@ -7,6 +7,7 @@ class Service(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 class ServiceVariant(models.Model):
@@ -15,3 +16,27 @@ class ServiceVariant(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     estimated_minutes = models.IntegerField()
     stock = models.IntegerField()   # simultaneous bookings allowed
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ServiceListing(models.Model):
+    """
+    One catalog card per service, denormalized from Service, ServiceVariant
+    and VendorProfile and kept current by services.listings.
+    """
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, primary_key=True, related_name="listing")
+    name = models.CharField(max_length=255)
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name="+")
+    vendor_name = models.CharField(max_length=255)
+    vendor_is_active = models.BooleanField(default=True)
+    is_active = models.BooleanField(default=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    total_stock = models.IntegerField(default=0)
+    variant_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField()  # latest change of any source row
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_active", "vendor_is_active", "min_price"]),
+            models.Index(fields=["vendor", "is_active"]),
+        ]
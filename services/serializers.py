@@ -1,5 +1,32 @@
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Service, ServiceVariant
+from common.cache import bump_namespaces
+from .cache import get_variants, invalidate
+from .inventory import shift_stock
+from .models import Service, ServiceVariant, ServiceListing
+
+
+class CachedVariantField(serializers.PrimaryKeyRelatedField):
+    """A variant id, resolved through services.cache with its service and vendor attached."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", ServiceVariant.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        variant = get_variants([pk]).get(pk)
+        if variant is None:
+            self.fail("does_not_exist", pk_value=data)
+        return variant
 
 
 class ServiceVariantSerializer(serializers.ModelSerializer):
@@ -16,8 +43,18 @@ class ServiceVariantSerializer(serializers.ModelSerializer):
         fields = ["id", "service", "service_name", "name", "price", "estimated_minutes", "stock"]
 
 
+class NestedServiceVariantSerializer(serializers.ModelSerializer):
+    # the parent service is implied when variants are written through ServiceSerializer
+    id = serializers.IntegerField(required=False)  # for updates
+    service_name = serializers.ReadOnlyField(source="service.name")
+
+    class Meta:
+        model = ServiceVariant
+        fields = ["id", "service_name", "name", "price", "estimated_minutes", "stock"]
+
+
 class ServiceSerializer(serializers.ModelSerializer):
-    variants = ServiceVariantSerializer(many=True, required=False)
+    variants = NestedServiceVariantSerializer(many=True, required=False)
 
     class Meta:
         model = Service
@@ -26,10 +63,14 @@ class ServiceSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         variants_data = validated_data.pop("variants", [])
-        service = Service.objects.create(**validated_data)
-
         for variant_data in variants_data:
-            ServiceVariant.objects.create(service=service, **variant_data)
+            variant_data.pop("id", None)
+
+        with transaction.atomic():
+            service = Service.objects.create(**validated_data)
+            ServiceVariant.objects.bulk_create([
+                ServiceVariant(service=service, **variant_data) for variant_data in variants_data
+            ])
 
         return service
 
@@ -42,12 +83,94 @@ class ServiceSerializer(serializers.ModelSerializer):
         # Allow admin to change vendor
         if "vendor" in validated_data:
             instance.vendor = validated_data["vendor"]
-        instance.save()
 
-        if variants_data is not None:
-            # Remove old variants and add new ones
-            instance.variants.all().delete()
-            for variant_data in variants_data:
-                ServiceVariant.objects.create(service=instance, **variant_data)
+        # one transaction, so the index/listing refreshes queued by the
+        # service save run once every variant change is in
+        with transaction.atomic():
+            instance.save()
+            if variants_data is not None:
+                self.sync_variants(instance, variants_data)
 
         return instance
+
+    def sync_variants(self, instance, variants_data):
+        """
+        Match incoming variants to the existing ones by id: changed ones go
+        out in one bulk_update, new ones in one bulk_create and only the
+        variants missing from the payload are deleted.
+        """
+        existing = {variant.id: variant for variant in instance.variants.all()}
+        fields = ["name", "price", "estimated_minutes", "stock"]
+        now = timezone.now()
+        to_update, to_create, kept, restocked = [], [], set(), {}
+
+        for variant_data in variants_data:
+            variant_id = variant_data.pop("id", None)
+            if variant_id is None:
+                to_create.append(ServiceVariant(service=instance, **variant_data))
+                continue
+
+            variant = existing.get(variant_id)
+            if variant is None:
+                raise serializers.ValidationError(
+                    {"variants": f"Variant {variant_id} does not belong to this service."}
+                )
+
+            kept.add(variant_id)
+            changed = False
+            for field, value in variant_data.items():
+                if getattr(variant, field) != value:
+                    if field == "stock":
+                        restocked[variant_id] = value - variant.stock
+                    setattr(variant, field, value)
+                    changed = True
+            if changed:
+                variant.updated_at = now
+                to_update.append(variant)
+
+        removed = set(existing) - kept
+        if removed:
+            try:
+                ServiceVariant.objects.filter(pk__in=removed).delete()
+            except ProtectedError:
+                raise serializers.ValidationError(
+                    {"variants": "Variants that already have orders can't be removed."}
+                )
+
+        if to_update:
+            ServiceVariant.objects.bulk_update(to_update, fields + ["updated_at"])
+            # bulk_update skips post_save
+            invalidate("variant", [variant.pk for variant in to_update])
+            transaction.on_commit(lambda: bump_namespaces(f"variant:{variant.pk}" for variant in to_update))
+        if to_create:
+            ServiceVariant.objects.bulk_create(to_create)
+        # new variants are seeded from the database when first taken
+        shift_stock(restocked)
+
+
+class CatalogVariantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ServiceVariant
+        fields = ["id", "name", "price", "estimated_minutes", "stock"]
+
+
+class CatalogServiceSerializer(serializers.ModelSerializer):
+    vendor_name = serializers.ReadOnlyField(source="vendor.business_name")
+    variants = CatalogVariantSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Service
+        fields = ["id", "name", "description", "vendor", "vendor_name", "variants"]
+
+
+class CatalogListingSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source="service_id")
+    description = serializers.ReadOnlyField(source="service.description")
+    variants = CatalogVariantSerializer(source="service.variants", many=True, read_only=True)
+
+    class Meta:
+        model = ServiceListing
+        fields = [
+            "id", "name", "description", "vendor", "vendor_name",
+            "min_price", "total_stock", "variant_count", "variants",
+        ]
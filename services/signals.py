@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from vendors.models import VendorProfile
+from .cache import invalidate
+from .listings import schedule_refresh
+from .models import Service, ServiceVariant
+
+
+@receiver(post_save, sender=Service)
+def refresh_service_listing(sender, instance, **kwargs):
+    schedule_refresh([instance.pk])
+
+
+@receiver(post_save, sender=ServiceVariant)
+@receiver(post_delete, sender=ServiceVariant)
+def refresh_variant_listing(sender, instance, **kwargs):
+    schedule_refresh([instance.service_id])
+
+
+@receiver(post_save, sender=VendorProfile)
+def refresh_vendor_listings(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(instance.services.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=ServiceVariant)
+@receiver(post_delete, sender=ServiceVariant)
+def forget_cached_variant(sender, instance, **kwargs):
+    invalidate("variant", [instance.pk])
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def forget_cached_service(sender, instance, **kwargs):
+    invalidate("service", [instance.pk])
+
+
+@receiver(post_save, sender=VendorProfile)
+@receiver(post_delete, sender=VendorProfile)
+def forget_cached_vendor(sender, instance, **kwargs):
+    invalidate("vendor", [instance.pk])
@@ -0,0 +1,13 @@
+from celery import shared_task
+from .inventory import reconcile_stock
+from .listings import refresh_stale_listings
+
+
+@shared_task
+def reconcile_inventory_task():
+    return reconcile_stock()
+
+
+@shared_task
+def refresh_stale_listings_task():
+    return refresh_stale_listings()
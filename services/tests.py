@@ -1,3 +1,14 @@
-from django.test import TestCase
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+
+class CatalogFilterTests(APITestCase):
+    def test_non_finite_prices_are_rejected(self):
+        for value in ("nan", "sNaN", "Infinity", "-inf", "abc"):
+            for param in ("min_price", "max_price"):
+                response = self.client.get("/api/v1/catalog/", {param: value})
+                self.assertEqual(response.status_code, 400, f"{param}={value}")
+                self.assertIn(param, response.json())
+
+    def test_finite_price_is_accepted(self):
+        response = self.client.get("/api/v1/catalog/", {"min_price": "1.50", "max_price": "1e3"})
+        self.assertEqual(response.status_code, 200)
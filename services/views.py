@@ -1,11 +1,22 @@
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticated
+import hashlib
+from decimal import Decimal, InvalidOperation
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from .models import Service, ServiceVariant
-from .serializers import ServiceSerializer, ServiceVariantSerializer
+from .inventory import shift_stock
+from .models import Service, ServiceVariant, ServiceListing
+from .serializers import (
+    ServiceSerializer, ServiceVariantSerializer, CatalogServiceSerializer, CatalogListingSerializer,
+)
 from .permission import IsVendorOrAdmin
 from vendors.models import VendorProfile
+from common.cache import CachedResponseMixin
+from users.authentication import ClaimsJWTAuthentication
 
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
@@ -19,15 +30,16 @@ from vendors.models import VendorProfile
 class ServiceViewSet(ModelViewSet):
     serializer_class = ServiceSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get_queryset(self):
         user = self.request.user
 
         if user.role == "admin":
-            return Service.objects.all()
+            return Service.objects.prefetch_related("variants")
 
         if user.role == "vendor":
-            return Service.objects.filter(vendor__user=user)
+            return Service.objects.filter(vendor_id=user.vendor_profile_id).prefetch_related("variants")
 
         # customers cannot access
         return Service.objects.none()
@@ -47,7 +59,7 @@ class ServiceViewSet(ModelViewSet):
 
         elif user.role == "vendor":
             try:
-                vendor = VendorProfile.objects.get(user=user)
+                vendor = VendorProfile.objects.get(pk=user.vendor_profile_id)
             except VendorProfile.DoesNotExist:
                 raise PermissionDenied("Vendor profile not found. Please create your VendorProfile first.")
             serializer.save(vendor=vendor)
@@ -59,6 +71,7 @@ class ServiceViewSet(ModelViewSet):
 class ServiceVariantViewSet(ModelViewSet):
     serializer_class = ServiceVariantSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get_queryset(self):
         user = self.request.user
@@ -67,7 +80,7 @@ class ServiceVariantViewSet(ModelViewSet):
             return ServiceVariant.objects.all()
 
         if user.role == "vendor":
-            return ServiceVariant.objects.filter(service__vendor__user=user)
+            return ServiceVariant.objects.filter(service__vendor_id=user.vendor_profile_id)
 
         return ServiceVariant.objects.none()
 
@@ -89,9 +102,151 @@ class ServiceVariantViewSet(ModelViewSet):
 
         elif user.role == "vendor":
             # Vendor can only attach variants to their own services
-            if service.vendor.user != user:
+            if service.vendor_id != user.vendor_profile_id:
                 raise PermissionDenied("You cannot add variant to this service")
             serializer.save(service=service)
 
         else:
-            raise PermissionDenied("You do not have permission to create variants")
\ No newline at end of file
+            raise PermissionDenied("You do not have permission to create variants")
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.stock
+        super().perform_update(serializer)
+        # only what the vendor added or removed; the live counter also
+        # accounts for reservations and sales not yet reconciled
+        shift_stock({serializer.instance.pk: serializer.instance.stock - previous})
+
+
+class CatalogPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "-pk"
+
+
+class CatalogValidatorsMixin:
+    """ETag/Last-Modified for catalog responses, answering revalidations with a 304."""
+
+    def _last_change(self, queryset):
+        # one aggregate query: anything that changes the response moves
+        # either a timestamp or a count
+        if self.action == "list":
+            stats = queryset.order_by().aggregate(
+                rows=Count("pk"), variants=Sum("variant_count"), changed_at=Max("updated_at")
+            )
+            return f"{stats['rows']}/{stats['variants']}", stats["changed_at"]
+
+        stats = queryset.order_by().aggregate(
+            service_count=Count("id", distinct=True),
+            variant_count=Count("variants", distinct=True),
+            service_at=Max("updated_at"),
+            variant_at=Max("variants__updated_at"),
+            vendor_at=Max("vendor__updated_at"),
+        )
+        stamps = [stats[key] for key in ("service_at", "variant_at", "vendor_at") if stats[key]]
+        return f"{stats['service_count']}/{stats['variant_count']}", max(stamps) if stamps else None
+
+    def _validators(self, queryset):
+        counts, last_modified = self._last_change(queryset)
+        fingerprint = "|".join([
+            self.request.get_full_path(),
+            counts,
+            last_modified.isoformat() if last_modified else "",
+        ])
+        return quote_etag(hashlib.md5(fingerprint.encode()).hexdigest()), last_modified
+
+    def _conditional(self, request, queryset, render, *args, **kwargs):
+        etag, last_modified = self._validators(queryset)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render(request, *args, **kwargs)
+
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._conditional(request, queryset, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not str(kwargs["pk"]).isdigit():
+            raise NotFound()
+        queryset = self.get_queryset().filter(pk=kwargs["pk"])
+        return self._conditional(request, queryset, super().retrieve, *args, **kwargs)
+
+
+# the response cache sits in front of the validators, so a hit runs no queries
+class CatalogViewSet(CachedResponseMixin, CatalogValidatorsMixin, ReadOnlyModelViewSet):
+    """
+    Public, read-only catalog of active services from active vendors.
+
+    The list reads the ServiceListing read model only (plus one prefetch of
+    the page's variants). Filters: ?min_price=&max_price= on the lowest
+    variant price and ?vendor=<id>. Responses carry ETag/Last-Modified so
+    clients can revalidate with If-None-Match / If-Modified-Since and get a
+    304 without a payload. Rendered list pages are cached until a listing
+    changes more than its stock; a service's page until that service's
+    listing is refreshed.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    pagination_class = CatalogPagination
+    cache_name = "catalog"
+
+    def cache_namespaces(self):
+        # bumped by services.listings.refresh_listings
+        if self.action == "retrieve":
+            return ["catalog", f"catalog:service:{self.kwargs['pk']}"]
+        return ["catalog"]
+
+    def get_queryset(self):
+        if self.action == "list":
+            return (
+                ServiceListing.objects.filter(is_active=True, vendor_is_active=True)
+                .select_related("service")
+                .prefetch_related("service__variants")
+            )
+        return (
+            Service.objects.filter(is_active=True, vendor__is_active=True)
+            .select_related("vendor")
+            .prefetch_related("variants")
+        )
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return CatalogListingSerializer
+        return CatalogServiceSerializer
+
+    def _decimal_param(self, name):
+        value = self.request.query_params.get(name)
+        if value in (None, ""):
+            return None
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            number = None
+        # NaN and Infinity parse, but can't be compared with a price
+        if number is None or not number.is_finite():
+            raise ValidationError({name: "Must be a number."})
+        return number
+
+    def filter_queryset(self, queryset):
+        params = self.request.query_params
+        min_price = self._decimal_param("min_price")
+        max_price = self._decimal_param("max_price")
+
+        if min_price is not None:
+            queryset = queryset.filter(min_price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(min_price__lte=max_price)
+
+        if params.get("vendor"):
+            if not params["vendor"].isdigit():
+                raise ValidationError({"vendor": "Must be a vendor id."})
+            queryset = queryset.filter(vendor_id=params["vendor"])
+
+        return queryset
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from common.admin import EstimatedCountPaginator
 from users.models import User
 
 # Register your models here.
@@ -48,4 +49,7 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('email',)
     ordering = ('email',)
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
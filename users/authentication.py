@@ -0,0 +1,87 @@
+import logging
+import time
+from functools import cached_property
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from common.redis import redis_client
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+def user_claims(user):
+    """Claims that let the API authorize a request without loading the user."""
+    return {
+        "role": user.role,
+        "vendor_profile_id": user.vendor_profile_id,
+        # when these claims were read from the database, see revoke_tokens
+        "auth_time": time.time(),
+    }
+
+
+def _revoked_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def revoke_tokens(user_id):
+    """
+    Reject every access token of the user whose claims were built before now,
+    e.g. after a role change or deactivation. The client gets a 401 and has to
+    refresh, which reads the claims from the database again.
+    """
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    try:
+        redis_client.set(_revoked_key(user_id), time.time(), ex=ttl)
+    except RedisError as exc:
+        logger.warning("Could not revoke the tokens of user %s: %s", user_id, exc)
+
+
+def _claims_match_database(token):
+    vendor_ids = list(
+        User.objects.filter(
+            pk=token[api_settings.USER_ID_CLAIM], is_active=True, role=token["role"]
+        ).values_list("vendorprofile", flat=True)
+    )
+    return bool(vendor_ids) and vendor_ids[0] == token.get("vendor_profile_id")
+
+
+def is_revoked(token):
+    try:
+        revoked_at = redis_client.get(_revoked_key(token[api_settings.USER_ID_CLAIM]))
+    except RedisError:
+        # without the deny-list, check the claims against the user row instead
+        return not _claims_match_database(token)
+    return revoked_at is not None and token.get("auth_time", 0) < float(revoked_at)
+
+
+class ClaimsUser(TokenUser):
+    """request.user built from the access token's claims, without a database query."""
+
+    @cached_property
+    def role(self):
+        return self.token.get("role")
+
+    @cached_property
+    def vendor_profile_id(self):
+        return self.token.get("vendor_profile_id")
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the role and vendor claims instead of
+    loading the User row. Views using it only get a ClaimsUser, so they must
+    filter on ids (user.id, user.vendor_profile_id) rather than instances.
+    """
+
+    def get_user(self, validated_token):
+        if "role" not in validated_token:
+            # issued before these claims existed
+            raise InvalidToken("Token has no role claim, refresh it.")
+
+        user = super().get_user(validated_token)
+        if is_revoked(validated_token):
+            raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+        return user
@@ -31,3 +31,19 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+    @property
+    def vendor_profile_id(self):
+        # same interface as users.authentication.ClaimsUser, which reads it from the token
+        vendor = getattr(self, "vendorprofile", None)
+        return vendor.pk if vendor else None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # what the user's tokens were issued with, see users.signals
+        user._claims_state = user.claims_state()
+        return user
+
+    def claims_state(self):
+        return (self.__dict__.get("role"), self.__dict__.get("is_active"))
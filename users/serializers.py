@@ -1,4 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import user_claims
 from .models import User
 
 class UserSerializer(serializers.ModelSerializer):
@@ -44,3 +48,31 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
         user.save()
         return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Rebuilds the claims from the database, so a refresh picks up role and vendor changes."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = (
+            User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True)
+            .select_related("vendorprofile")
+            .first()
+        )
+        if user is None:
+            raise AuthenticationFailed("No active account found for this token.", code="no_active_account")
+
+        access = refresh.access_token
+        for claim, value in user_claims(user).items():
+            access[claim] = value
+        return {"access": str(access)}
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from vendors.models import VendorProfile
+from .authentication import revoke_tokens
+from .models import User
+
+
+def schedule_revoke(user_id):
+    transaction.on_commit(lambda: revoke_tokens(user_id))
+
+
+@receiver(post_save, sender=User)
+def revoke_on_claim_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_claims_state", None)
+    if not created and previous is not None and previous != instance.claims_state():
+        schedule_revoke(instance.pk)
+    instance._claims_state = instance.claims_state()
+
+
+@receiver(post_delete, sender=User)
+def revoke_on_delete(sender, instance, **kwargs):
+    schedule_revoke(instance.pk)
+
+
+# vendor_profile_id is a claim too
+@receiver(post_save, sender=VendorProfile)
+def revoke_on_vendor_created(sender, instance, created, **kwargs):
+    if created:
+        schedule_revoke(instance.user_id)
+
+
+@receiver(post_delete, sender=VendorProfile)
+def revoke_on_vendor_deleted(sender, instance, **kwargs):
+    schedule_revoke(instance.user_id)
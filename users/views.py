@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from .models import User
 from .serializers import UserSerializer, UserCreateSerializer
 from .permission import IsAdmin
+from .authentication import ClaimsJWTAuthentication
 from rest_framework.decorators import api_view
 
 # @api_view(['GET'])
@@ -11,6 +12,7 @@ class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get_queryset(self):
         # Admin can see all users
@@ -1,13 +1,44 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models.functions import Now
+from common.cache import bump_namespaces
+from services.cache import invalidate
+from services.listings import schedule_refresh
 from .models import VendorProfile
 
+
+def set_active(modeladmin, request, queryset, is_active):
+    # one UPDATE; post_save doesn't fire, so the catalog listings, the cached
+    # vendors and the cached vendor responses are refreshed here
+    vendor_ids = list(queryset.values_list("pk", flat=True))
+    service_ids = list(queryset.values_list("services__pk", flat=True))
+    updated = queryset.update(is_active=is_active, updated_at=Now())
+    schedule_refresh(pk for pk in service_ids if pk is not None)
+    invalidate("vendor", vendor_ids)
+    transaction.on_commit(lambda: bump_namespaces(["vendors", *[f"vendor:{pk}" for pk in vendor_ids]]))
+    modeladmin.message_user(request, f"{updated} vendor(s) updated.", messages.SUCCESS)
+
+
+@admin.action(description="Activate selected vendors")
+def activate_vendors(modeladmin, request, queryset):
+    set_active(modeladmin, request, queryset, True)
+
+
+@admin.action(description="Deactivate selected vendors")
+def deactivate_vendors(modeladmin, request, queryset):
+    set_active(modeladmin, request, queryset, False)
+
+
 @admin.register(VendorProfile)
 class VendorProfileAdmin(admin.ModelAdmin):
     list_display = ['business_name', 'user_email', 'is_active', 'created_at']
+    list_select_related = ['user']
     list_filter = ['is_active', 'created_at']
     search_fields = ['business_name', 'user__email']
     readonly_fields = ['created_at']
+    actions = [activate_vendors, deactivate_vendors]
 
     def user_email(self, obj):
         return obj.user.email
     user_email.short_description = "User Email"
+    user_email.admin_order_field = "user__email"
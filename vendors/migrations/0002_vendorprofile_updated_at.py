@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -8,3 +8,4 @@ class VendorProfile(models.Model):
     address = models.TextField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -1,21 +1,66 @@
+from datetime import timedelta
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
+from common.cache import CachedResponseMixin
+from orders.rollups import sales_dashboard
+from users.authentication import ClaimsJWTAuthentication
 from .models import VendorProfile
 from .serializers import VendorProfileSerializer
 from .permission import IsVendor
 
-class VendorProfileViewSet(ModelViewSet):
+class VendorProfileViewSet(CachedResponseMixin, ModelViewSet):
     serializer_class = VendorProfileSerializer
     permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    cache_name = "vendors"
+
+    def cache_namespaces(self):
+        user = self.request.user
+        if user.role == "admin":
+            return ["vendors"]
+        return [f"vendor:{user.vendor_profile_id}"]
 
     def get_queryset(self):
         user = self.request.user
         if user.role == "admin":
             return VendorProfile.objects.all()
         if user.role == "vendor":
-            return VendorProfile.objects.filter(user=user)
+            return VendorProfile.objects.filter(pk=user.vendor_profile_id)
         return VendorProfile.objects.none()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
+
+    def _date_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if value in (None, ""):
+            return default
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: "Must be a date (YYYY-MM-DD)."})
+        return parsed
+
+    @action(detail=True, methods=["get"])
+    def dashboard(self, request, pk=None):
+        """Sales figures read from the daily rollups, so the cost doesn't grow with order history."""
+        vendor = self.get_object()
+        end = self._date_param("to", timezone.localdate())
+        start = self._date_param("from", end - timedelta(days=29))
+        if start > end:
+            raise ValidationError({"from": "Must not be after 'to'."})
+
+        return Response({
+            "vendor": vendor.pk,
+            "from": start,
+            "to": end,
+            **sales_dashboard(vendor.pk, start, end),
+        })